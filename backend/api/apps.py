@@ -1,7 +1,18 @@
 #api/apps.py
+import sys
 from django.apps import AppConfig
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from db_utils.db_factory import DBFactory, DBType, db_configs
+        from db_utils.migrator import MigrationRunner
+
+        # Bring the database schema up to date when the development server or test suite starts.
+        # Anything else (ex. WSGI server workers, other commands) relies on: python manage.py migrate_db
+        command = sys.argv[1] if len(sys.argv) > 1 else None
+        if command in db_configs[DBType.SQLITE].get("AUTO_MIGRATE_COMMANDS", []):
+            MigrationRunner(DBFactory.get_db_connection(DBType.SQLITE)).apply_pending()
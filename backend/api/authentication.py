@@ -1,12 +1,17 @@
 # api/authentication.py
+import hashlib
+import time
+from db_utils.caches import LRUCache
 from db_utils.db_factory import DBFactory, DBType
 from db_utils.queries import SQLiteDBQuery
-from django.contrib.auth.hashers import check_password
+from django.conf import settings
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
 from jwt import InvalidTokenError
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
 from api.models import User
+from api.password_hashing import password_hashing_pool
 
 """
 CLASSES: 
@@ -16,8 +21,48 @@ CustomJWTAuthentication,
 # Initialize specific query object
 db_query = SQLiteDBQuery(DBFactory.get_db_connection(DBType.SQLITE))
 
+# Authenticated users by id, so authenticated requests don't have to read the User table
+# (user_cache.hits / user_cache.misses count how often it is used)
+user_cache = LRUCache(
+    max_size=settings.AUTH_USER_CACHE["MAX_SIZE"],
+    ttl=settings.AUTH_USER_CACHE["TTL"],
+)
+
+# Verified access tokens by the digest of the raw token, so repeat requests skip signature checks and parsing
+token_cache = LRUCache(max_size=settings.AUTH_TOKEN_CACHE["MAX_SIZE"])
+
+# Current user versions by id for claims-only authentication, re-read once an entry expires
+user_version_cache = LRUCache(
+    max_size=settings.AUTH_USER_CACHE["MAX_SIZE"],
+    ttl=settings.AUTH_CLAIMS_ONLY["VERSION_CHECK_INTERVAL"],
+)
+
 
 class CustomJWTAuthentication(JWTAuthentication):
+    def get_validated_token(self, raw_token):
+        """Override get_validated_token to reuse tokens that were already verified by this process.
+
+        Args:
+            raw_token (bytes): The encoded JWT from the Authorization header.
+
+        Raises:
+            InvalidToken: The token's signature or claims are invalid, or it has expired.
+
+        Returns:
+            JWTToken: The validated token.
+        """
+
+        key = hashlib.sha256(raw_token).digest()
+        validated_token = token_cache.get(key)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+
+            # Cache the token until it expires, after that it has to be verified (and rejected) again
+            expires_in = validated_token.get("exp", 0) - time.time()
+            if expires_in > 0:
+                token_cache.set(key, validated_token, ttl=expires_in)
+        return validated_token
+
     def get_user(self, user_token):
         """Override get_user to retrieve user from custom database instead of Django's ORM.
 
@@ -39,12 +84,79 @@ class CustomJWTAuthentication(JWTAuthentication):
                 _("Token contained no recognizable user identification")
             )
 
-        user_data = db_query.get_user_by_id(user_id)
+        # Claims-only mode -> build the user from the token (tokens issued without the claims use the database)
+        if settings.AUTH_CLAIMS_ONLY["ENABLED"] and "username" in user_token and "user_version" in user_token:
+            return self.get_user_from_claims(user_id, user_token)
 
+        # Ids can be ints (token) or strings (url), so they share one key
+        user_data = user_cache.get(str(user_id))
         if user_data is None:
-            raise AuthenticationFailed("User not found.")
+            user_data = db_query.get_user_by_id(user_id)
+
+            if user_data is None:
+                raise AuthenticationFailed("User not found.")
+            user_cache.set(str(user_id), user_data)
         return User(**user_data)
 
+    def get_user_from_claims(self, user_id, user_token):
+        """Builds a lightweight user (id and username only) from an access token's claims.
+
+        The token's user version must match the user's current version, which is cached for
+        VERSION_CHECK_INTERVAL seconds, so tokens of updated or deleted users stop working within that window.
+
+        Args:
+            user_id (int): The ID of the user.
+            user_token (JWTToken): A JWT token with the username and user_version claims.
+
+        Raises:
+            AuthenticationFailed: The user was updated or deleted after the token was issued.
+
+        Returns:
+            User: The authenticated user.
+        """
+        version = user_version_cache.get(str(user_id))
+        if version is None:
+            version = db_query.get_user_version(user_id)
+
+            if version is None:
+                raise AuthenticationFailed("User not found.")
+            user_version_cache.set(str(user_id), version)
+
+        if version != user_token["user_version"]:
+            raise AuthenticationFailed("Token is no longer valid, please log in again.")
+        return User(id=user_id, username=user_token["username"], version=version)
+
+    @staticmethod
+    def get_tokens_for_user(user):
+        """Creates a refresh token (and its access token) carrying the claims used by claims-only authentication.
+
+        Args:
+            user (User): The user to create the tokens for.
+
+        Returns:
+            RefreshToken: The refresh token, the access token is available as refresh.access_token.
+        """
+        refresh = RefreshToken.for_user(user)
+        # Copied to every access token created from this refresh token
+        refresh["username"] = user.username
+        refresh["user_version"] = user.version
+        return refresh
+
+    @staticmethod
+    def invalidate_user(user_id):
+        """Removes a user from the user caches. Must be called after the user is updated or deleted.
+
+        Inside a transaction scope the caches are cleared once it commits, so the old row can't be cached again in between.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        def invalidate():
+            user_cache.delete(str(user_id))
+            user_version_cache.delete(str(user_id))
+
+        db_query.db_connection.on_commit(invalidate)
+
     @staticmethod
     def validate_user_credentials(username, password):
         """Validates username and password."""
@@ -56,8 +168,8 @@ class CustomJWTAuthentication(JWTAuthentication):
             # User doesn't exist
             return None
 
-        # Check password
-        if user_data and check_password(password, user_data["password"]):
+        # Check password (hashed on the worker pool, raises PasswordHashingBusy if it's full)
+        if user_data and password_hashing_pool.check_password(password, user_data["password"]):
             return User(**user_data)
 
 
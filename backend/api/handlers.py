@@ -4,33 +4,52 @@ CLASSES:
 UserHandler, ListingHandler
 '''
 
+import json
 import os
 import uuid
-from db_utils.db_factory import DBFactory, DBType
+from db_utils.caches import LRUCache
+from db_utils.db_factory import DBFactory, DBType, db_configs
 from db_utils.queries import SQLiteDBQuery
+from db_utils.sequences import LazyQuerySequence
+from db_utils.write_behind import ListingCounterBuffer
 from django.conf import settings
-from django.contrib.auth.hashers import make_password
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from api.authentication import CustomJWTAuthentication
+from api.password_hashing import password_hashing_pool
+from api.response_cache import get_listing_response_cache
+from api.streaming import StreamingJSONResponse
 from api.serializers import ListingSerializer, UserSerializer
 from .models import Listing, User
 
 # Initialize specific query object
 db_query = SQLiteDBQuery(DBFactory.get_db_connection(DBType.SQLITE))
 
+# Optional write-behind buffer for like/dislike counts
+counter_flush_interval_ms = db_configs[DBType.SQLITE].get("COUNTER_FLUSH_INTERVAL_MS")
+counter_buffer = ListingCounterBuffer(db_query, counter_flush_interval_ms).start() if counter_flush_interval_ms else None
+
+# Facet counts per normalized filter set (see ListingHandler.get_listing_facets)
+facet_cache = LRUCache(max_size=256)
+
+# Optional cache of rendered listing feed pages, listing writes drop the pages they change
+listing_response_cache = get_listing_response_cache()
+if listing_response_cache:
+    db_query.add_listing_listener(listing_response_cache.invalidate)
+
 
 class UserHandler:
     """A handler class that handles all DB interactions related to user objects.
     """
     def login(self, user_data):
         if user_data:
-            # Get users id
-            user = db_query.get_user_by_username(user_data["username"])
-            user_data["id"] = user["id"]
+            # LoginSerializer already loaded the user while checking the password
+            user = user_data.get("user")
+            if user is None:
+                user = User(**db_query.get_user_by_username(user_data["username"]))
 
             # Create tokens for the authenticated user
-            refresh = RefreshToken.for_user(User(**user_data))
+            refresh = CustomJWTAuthentication.get_tokens_for_user(user)
             access_token = str(refresh.access_token)
 
             # Return tokens in the response
@@ -49,9 +68,16 @@ class UserHandler:
 
     def list_users(self):
         # Public info so no checks needed, just retrieve users from db
-        users = db_query.get_all_users()
-        # ** operator is used to pass all key value pairs to the calling function
-        return [User(**user) for user in users]
+        # Users are only fetched when the sequence is sliced, so a paginator loads a single page
+        def fetch_users(limit, offset):
+            # Rows are mapped straight into User records
+            return db_query.get_all_users(limit, offset, model=User)
+
+        return LazyQuerySequence(db_query.count_users, fetch_users)
+
+    def stream_users(self):
+        # Unpaginated lists -> a stream that fetches the user rows in batches, one short query per batch
+        return db_query.get_all_users(stream=True)
 
     def register_user(self, validated_data):
         # Check if user already exists
@@ -59,8 +85,8 @@ class UserHandler:
         if db_query.get_user_by_username(new_username):
             return Response({"error": "Username already exists."},status=status.HTTP_409_CONFLICT,)
 
-        # Generate password
-        validated_data["password"] = make_password(validated_data["password"])
+        # Generate password (on the hashing pool, which raises PasswordHashingBusy -> 503 if it's full)
+        validated_data["password"] = password_hashing_pool.make_password(validated_data["password"])
 
         # Create image if given
         image = validated_data.get("image")
@@ -75,7 +101,7 @@ class UserHandler:
         validated_data["id"] = user_id
 
         # Generate JWT token for the new user
-        refresh = RefreshToken.for_user(User(**validated_data))
+        refresh = CustomJWTAuthentication.get_tokens_for_user(User(**validated_data))
         access = str(refresh.access_token)
 
         # Form response
@@ -114,7 +140,7 @@ class UserHandler:
             # Hash password, if user is changing password
             # Consider returning error here if we want to implement change password somewhere else
             if "password" in new_data:
-                new_data["password"] = make_password(new_data["password"])
+                new_data["password"] = password_hashing_pool.make_password(new_data["password"])
 
             # The "|" operator merges dictionaries + the later dict overwrites values from older dict if the keys are equal
             #merged_data = existing_data | new_data
@@ -133,6 +159,7 @@ class UserHandler:
                     serializer.validated_data["image"] = valid_path
 
                 db_query.partial_update_user(id, serializer.validated_data)
+                CustomJWTAuthentication.invalidate_user(id)
                 return Response({"detail": "User edited successfully."}, status=status.HTTP_204_NO_CONTENT,)
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -148,6 +175,7 @@ class UserHandler:
         # Ensure user is deleting their own account
         if request.user.id == int(id):
             db_query.delete_user(id)
+            CustomJWTAuthentication.invalidate_user(id)
             return Response({"detail": "User deleted successfully."}, status=status.HTTP_204_NO_CONTENT,)
         else:
             return Response({"error": "Invalid credentials"}, status=status.HTTP_403_FORBIDDEN)
@@ -257,10 +285,62 @@ class ListingHandler:
         # Public info so no checks needed, just retrieve listings from db
         return db_query.get_all_listings()
     
-    def list_filtered_listings(self, filters=None, search_term=None, ordering=None):
+    def list_filtered_listings(self, filters=None, search_term=None, ordering=None, search_mode=None, as_rows=False):
         # Public info so no checks needed, just retrieve listings from db
-        listings = db_query.get_filtered_listings(filters, search_term, ordering)
-        return [Listing(**listing) for listing in listings]
+        # Listings are only fetched when the sequence is sliced, so a paginator loads a single page
+        # as_rows=True returns listing dicts instead of Listing records (ex. for ListingListSerializer)
+        fuzzy = {}
+
+        def get_fuzzy_matches():
+            # A fuzzy search runs once, then the count and the page share its matches
+            if search_term and search_mode == "fuzzy" and "matches" not in fuzzy:
+                fuzzy["matches"] = db_query.get_fuzzy_matches(search_term)
+            return fuzzy.get("matches")
+
+        def count_listings():
+            return db_query.count_filtered_listings(filters, search_term, search_mode, fuzzy_matches=get_fuzzy_matches())
+
+        def fetch_listings(limit, offset):
+            # Rows are mapped straight into Listing records (or dicts)
+            return db_query.get_filtered_listings(
+                filters, search_term, ordering, limit, offset, search_mode=search_mode, model=None if as_rows else Listing,
+                fuzzy_matches=get_fuzzy_matches(),
+            )
+
+        return LazyQuerySequence(count_listings, fetch_listings)
+
+    def stream_filtered_listings(self, filters=None, search_term=None, ordering=None, search_mode=None):
+        # Unpaginated lists -> a stream that fetches the listing rows in batches, one short query per batch
+        return db_query.get_filtered_listings(filters, search_term, ordering, search_mode=search_mode, stream=True)
+
+    def list_listings_after(self, filters=None, search_term=None, ordering=None, after=None, limit=12, search_mode=None):
+        # Keyset pagination -> fetch the listings that come after the (sort value, id) of the previous page
+        return db_query.get_filtered_listings(
+            filters, search_term, ordering, limit=limit, after=after, search_mode=search_mode, model=Listing
+        )
+
+    def get_listing_facets(self, filters=None, search_term=None, search_mode=None):
+        # Normalize the request so equivalent filter sets (ex. params in another order) share a cache entry
+        filters = dict(filters or {})
+        if "tags" in filters:
+            filters["tags"] = sorted(set(filters["tags"]))
+        search_term = (search_term or "").strip().lower() or None
+        search_mode = search_mode if search_term and search_mode == "fuzzy" else None
+
+        # Entries are keyed by the listing version, so any listing write invalidates them
+        # (likes/dislikes only matter when filtering on them)
+        db_query.sync_listing_versions()
+        if any(field in filters for field in ["min_likes", "max_dislikes"]):
+            version = db_query.listing_counter_version
+        else:
+            version = db_query.listing_version
+        key = (json.dumps(filters, sort_keys=True), search_term, search_mode, version)
+
+        facets = facet_cache.get(key)
+        if facets is None:
+            facets = db_query.get_listing_facets(filters, search_term, search_mode)
+            facet_cache.set(key, facets)
+        return facets
 
     def create_listing(self, validated_data, user_id):
         # Create listing with reference to calling user's id
@@ -286,6 +366,16 @@ class ListingHandler:
         else:
             return Listing(**listing_data)
 
+    def get_listing_version(self, id):
+        # (version, modified timestamp) of one listing, changes whenever it is written (by any process)
+        db_query.sync_listing_versions()
+        return db_query.get_listing_version(id)
+
+    def get_listings_version(self):
+        # (version, modified timestamp) of the listing table, changes whenever any listing (or its likes) is written
+        db_query.sync_listing_versions()
+        return db_query.listing_counter_version, db_query.listings_modified_at
+
     def partial_update_listing(self, request, id):
         listing = db_query.get_listing_by_id(id)
         if not listing:
@@ -404,38 +494,48 @@ class ListingHandler:
             user_id (int): The ID of the user whose favorite listings are being fetched.
 
         Returns:
-            Response: A DRF Response object with the list of favorite listings and an HTTP status.
+            StreamingJSONResponse: A response streaming the list of favorite listings, with an HTTP status.
         """
 
-        #fetch all favorite listings for the user
-        favorite_listings = db_query.retrieve_favorite_listings(user_id)
-
-        #if empty
-        if not favorite_listings:
-            return Response({"favorites": []},status=status.HTTP_200_OK)
-        #return
-        return Response({"favorites": favorite_listings},status=status.HTTP_200_OK)
+        #fetch the favorite listings in batches while the response is written, so memory stays flat for big accounts
+        favorite_listings = db_query.retrieve_favorite_listings(user_id, stream=True)
+        return StreamingJSONResponse(favorite_listings, key="favorites", status=status.HTTP_200_OK)
 
 
     '''
     Like/Dislike Listing actions:
     '''
-    def like_listing(self, listing_id, likes):
+    def like_listing(self, listing_id):
         try:
-            db_query.like_listing(listing_id, likes)
+            if not self._increment_counter(listing_id, likes=1):
+                return Response({"error": "Listing with that id not found."}, status=status.HTTP_404_NOT_FOUND)
             return Response({"detail": "Listing liked successfully."}, status=status.HTTP_204_NO_CONTENT,)
         except Exception as e:
             print(str(e))
             return Response({"error": "Server error occured."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def dislike_listing(self, listing_id, dislikes):
+    def dislike_listing(self, listing_id):
         try:
-            db_query.dislike_listing(listing_id, dislikes)
+            if not self._increment_counter(listing_id, dislikes=1):
+                return Response({"error": "Listing with that id not found."}, status=status.HTTP_404_NOT_FOUND)
             return Response({"detail": "Listing disliked successfully."}, status=status.HTTP_204_NO_CONTENT,)
         except Exception as e:
             print(str(e))
             return Response({"error": "Server error occured."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _increment_counter(self, listing_id, likes=0, dislikes=0):
+        # Returns False if the listing doesn't exist
+        if counter_buffer:
+            if not db_query.listing_exists(listing_id):
+                return False
+            counter_buffer.add(listing_id, likes, dislikes)
+            return True
+
+        # Single atomic UPDATE, which also tells us whether the listing exists
+        if likes:
+            return db_query.like_listing(listing_id, likes)
+        return db_query.dislike_listing(listing_id, dislikes)
+
 
 # Helper methods for saving/deleting an image
 @staticmethod
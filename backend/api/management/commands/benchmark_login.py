@@ -0,0 +1,73 @@
+# api/management/commands/benchmark_login.py
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from api.handlers import UserHandler, db_query
+from api.serializers import LoginSerializer, UserSerializer
+
+"""
+CLASSES:
+Command
+"""
+
+
+class Command(BaseCommand):
+    """Measures the database queries and latency of a login (LoginSerializer + UserHandler.login).
+
+    A temporary user is registered for the run and deleted afterwards.
+
+    run:
+    python manage.py benchmark_login
+    python manage.py benchmark_login --iterations 50
+    """
+
+    help = "Benchmarks logins, reporting the number of database queries and the latency per login."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20, help="Number of logins to time.")
+
+    def handle(self, *args, **options):
+        user_handler = UserHandler()
+        credentials = {"username": f"benchmark_{uuid.uuid4().hex[:12]}", "password": "BenchmarkPassword"}
+
+        serializer = UserSerializer(data=dict(credentials))
+        serializer.is_valid(raise_exception=True)
+        user_handler.register_user(serializer.validated_data)
+        user_id = db_query.get_user_by_username(credentials["username"])["id"]
+
+        try:
+            # Untimed login, so starting the password hashing workers isn't measured
+            self.login(user_handler, credentials)
+
+            queries = []
+            latencies = []
+            # Hold this thread's connection for the run, so every query goes through the traced connection
+            with db_query.db_connection as db:
+                db.connection.set_trace_callback(queries.append)
+                try:
+                    for _ in range(options["iterations"]):
+                        start = time.perf_counter()
+                        self.login(user_handler, credentials)
+                        latencies.append((time.perf_counter() - start) * 1000)
+                finally:
+                    db.connection.set_trace_callback(None)
+        finally:
+            db_query.delete_user(user_id)
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(f"Logins: {len(latencies)}")
+        self.stdout.write(f"Queries per login: {len(queries) / len(latencies):.1f}")
+        self.stdout.write(
+            f"Latency (ms): mean {statistics.mean(latencies):.1f}, "
+            f"p50 {statistics.median(latencies):.1f}, p95 {p95:.1f}"
+        )
+
+    def login(self, user_handler, credentials):
+        # Same steps as LoginView.post
+        serializer = LoginSerializer(data=dict(credentials))
+        serializer.is_valid(raise_exception=True)
+        response = user_handler.login(serializer.validated_data)
+        if response.status_code != 200:
+            raise RuntimeError(f"Login failed: {response.data}")
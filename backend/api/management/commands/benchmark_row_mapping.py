@@ -0,0 +1,112 @@
+# api/management/commands/benchmark_row_mapping.py
+import json
+import sqlite3
+import statistics
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from api.models import Listing
+from db_utils.queries import listing_converters, media_url
+from db_utils.row_mappers import RowMapper
+
+"""
+CLASSES:
+PreviousListing, Command
+"""
+
+
+class PreviousListing:
+    # The Listing model before __slots__ (one __dict__ per instance), for comparison
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class Command(BaseCommand):
+    """Compares turning a feed's rows into Listing records the previous way and with RowMapper.
+
+    Previous: a dict comprehension over each sqlite3.Row, then a __dict__ based Listing built from the dict.
+    RowMapper: the mapper compiled for the query's columns builds slotted Listing records directly.
+
+    The rows come from an in-memory database shaped like the Listing table, so the app's database isn't touched.
+
+    run:
+    python manage.py benchmark_row_mapping
+    python manage.py benchmark_row_mapping --rows 10000 --iterations 10
+    """
+
+    help = "Benchmarks mapping listing rows to records, reporting the time and memory per feed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Number of listing rows in the feed.")
+        parser.add_argument("--iterations", type=int, default=10, help="Number of times each mapping is timed.")
+
+    def handle(self, *args, **options):
+        rows = self.get_rows(options["rows"])
+
+        def map_previous():
+            listings = []
+            for row in rows:
+                listing = {column: row[column] for column in row.keys() if column != "tags"}
+                listing["tags"] = json.loads(row["tags"])
+                listing["image"] = media_url(listing["image"])
+                listings.append(PreviousListing(**listing))
+            return listings
+
+        def map_row_mapper():
+            return RowMapper.get(rows[0].keys(), Listing, listing_converters).map_rows(rows)
+
+        previous_ms, previous_peak, previous_size = self.measure(map_previous, options["iterations"])
+        mapper_ms, mapper_peak, mapper_size = self.measure(map_row_mapper, options["iterations"])
+
+        self.stdout.write(f"Rows: {len(rows)}")
+        self.stdout.write(
+            f"Previous (row dicts + Listing): {previous_ms:.1f} ms, "
+            f"peak {previous_peak / 1024:.0f} KiB, {previous_size / len(rows):.0f} bytes per listing"
+        )
+        self.stdout.write(
+            f"RowMapper (slotted Listing): {mapper_ms:.1f} ms, "
+            f"peak {mapper_peak / 1024:.0f} KiB, {mapper_size / len(rows):.0f} bytes per listing"
+        )
+        self.stdout.write(f"Speedup: {previous_ms / mapper_ms:.1f}x, memory: {mapper_size / previous_size:.0%} of previous")
+
+    def get_rows(self, count):
+        connection = sqlite3.connect(":memory:")
+        connection.row_factory = sqlite3.Row
+        connection.execute(
+            """
+            CREATE TABLE Listing (
+                id INTEGER PRIMARY KEY, title TEXT, condition TEXT, description TEXT, price REAL, image TEXT,
+                likes INTEGER, dislikes INTEGER, author_id INTEGER, created_at TEXT, tags TEXT
+            )
+            """
+        )
+        connection.executemany(
+            "INSERT INTO Listing VALUES (?, ?, 'Fair', 'A benchmark listing.', ?, ?, ?, 0, 1, '2024-12-11 03:55:02', ?)",
+            [(i, f"Listing {i}", i % 500, f"listings/{i}", i % 7, '["benchmark", "textbooks"]') for i in range(1, count + 1)],
+        )
+        # Same columns as SQLiteDBQuery.get_filtered_listings
+        rows = connection.execute(
+            """
+            SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at,
+            l.tags FROM Listing l ORDER BY l.id
+            """
+        ).fetchall()
+        connection.close()
+        return rows
+
+    def measure(self, map_rows, iterations):
+        # Median time (ms), then peak and retained memory (bytes) of one run
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            map_rows()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        try:
+            listings = map_rows()
+            size, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del listings
+        return statistics.median(latencies), peak, size
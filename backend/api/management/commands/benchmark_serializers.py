@@ -0,0 +1,74 @@
+# api/management/commands/benchmark_serializers.py
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from api.models import Listing
+from api.serializers import ListingListSerializer, ListingSerializer
+
+"""
+CLASSES:
+Command
+"""
+
+
+class Command(BaseCommand):
+    """Compares serializing a page of listings with ListingSerializer and with ListingListSerializer.
+
+    Pages are built from synthetic rows shaped like SQLiteDBQuery.get_filtered_listings results, so the
+    database isn't part of the measurement. Each run covers the work from query rows to output dicts:
+    Listing instances + ListingSerializer(many=True), against ListingListSerializer on the rows.
+
+    run:
+    python manage.py benchmark_serializers
+    python manage.py benchmark_serializers --page-size 50 --iterations 500
+    """
+
+    help = "Benchmarks the listing list serializers, reporting the time per page and the speedup."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=50, help="Number of listings per page.")
+        parser.add_argument("--iterations", type=int, default=200, help="Number of pages to time per serializer.")
+
+    def handle(self, *args, **options):
+        rows = [
+            {
+                "id": i,
+                "title": f"Listing {i}",
+                "condition": "Minimal Wear",
+                "description": "A benchmark listing with a description of a typical length.",
+                "price": 10.0 + i,
+                "image": f"/media/listings/benchmark-{i}" if i % 2 else None,
+                "likes": i,
+                "dislikes": 0,
+                "tags": ["benchmark", "textbooks"],
+                "created_at": "2024-12-11 03:55:02",
+                "author_id": 1,
+            }
+            for i in range(1, options["page_size"] + 1)
+        ]
+
+        def serialize_drf():
+            return ListingSerializer([Listing(**row) for row in rows], many=True).data
+
+        def serialize_fast():
+            return ListingListSerializer(rows, many=True).data
+
+        if serialize_drf() != serialize_fast():
+            raise RuntimeError("ListingListSerializer output differs from ListingSerializer.")
+
+        drf_ms = self.time_page(serialize_drf, options["iterations"])
+        fast_ms = self.time_page(serialize_fast, options["iterations"])
+
+        self.stdout.write(f"Listings per page: {len(rows)}")
+        self.stdout.write(f"ListingSerializer (ms per page): {drf_ms:.3f}")
+        self.stdout.write(f"ListingListSerializer (ms per page): {fast_ms:.3f}")
+        self.stdout.write(f"Speedup: {drf_ms / fast_ms:.1f}x")
+
+    def time_page(self, serialize, iterations):
+        # Median time per page, in ms
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            serialize()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return statistics.median(latencies)
@@ -0,0 +1,39 @@
+# api/management/commands/migrate_db.py
+from db_utils.db_factory import DBFactory, DBType
+from db_utils.migrator import MigrationRunner
+from django.core.management.base import BaseCommand
+
+"""
+CLASSES: 
+Command
+"""
+
+
+class Command(BaseCommand):
+    """Applies pending db_utils migrations to the app's database.
+
+    run:
+    python manage.py migrate_db
+    python manage.py migrate_db --list
+    """
+
+    help = "Applies pending db_utils/migrations/*.sql files to the app's database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--list", action="store_true", help="List migrations and whether they are applied.")
+
+    def handle(self, *args, **options):
+        runner = MigrationRunner(DBFactory.get_db_connection(DBType.SQLITE))
+
+        if options["list"]:
+            applied_versions = runner.get_applied_versions()
+            for version, name, _ in runner.get_migrations():
+                mark = "X" if version in applied_versions else " "
+                self.stdout.write(f"[{mark}] {version:04d}_{name}")
+            return
+
+        applied = runner.apply_pending()
+        if not applied:
+            self.stdout.write("No migrations to apply.")
+        for version, name in applied:
+            self.stdout.write(self.style.SUCCESS(f"Applied {version:04d}_{name}"))
@@ -8,8 +8,13 @@ User, Listing
 
 
 class User:
+    # Constructor arguments, in order (used by db_utils.row_mappers.RowMapper)
+    fields = ("id", "username", "password", "location", "email", "image", "version")
+    # No per instance __dict__, users are built for every row of a user list
+    __slots__ = fields
+
     def __init__(
-        self, id, username, password=None, location=None, email=None, image=None
+        self, id, username, password=None, location=None, email=None, image=None, version=0
     ):
         self.id = id
         self.username = username
@@ -17,6 +22,7 @@ class User:
         self.location = location
         self.email = email
         self.image = image
+        self.version = version  # Incremented on every update
 
     def __str__(self):
         return self.username
@@ -32,6 +38,24 @@ class User:
 
 
 class Listing:
+    # Constructor arguments, in order (used by db_utils.row_mappers.RowMapper)
+    fields = (
+        "id",
+        "title",
+        "condition",
+        "description",
+        "price",
+        "image",
+        "likes",
+        "dislikes",
+        "tags",
+        "created_at",
+        "author_id",
+        "relevance",
+    )
+    # No per instance __dict__, listings are built for every row of the feed
+    __slots__ = fields
+
     def __init__(
         self,
         id,
@@ -45,6 +69,7 @@ class Listing:
         tags,
         created_at,
         author_id,
+        relevance=None,
     ):
         self.id = id
         self.title = title
@@ -57,6 +82,8 @@ class Listing:
         self.tags = tags
         self.author_id = author_id
         self.created_at = created_at
+        # Search rank (BM25) when listings are ordered by relevance
+        self.relevance = relevance
 
     def __str__(self):
         return self.title
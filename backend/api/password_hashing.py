@@ -0,0 +1,119 @@
+# api/password_hashing.py
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+"""
+CLASSES:
+PasswordHashingBusy, PasswordHashingPool
+"""
+
+
+class PasswordHashingBusy(APIException):
+    """Raised when too many passwords are already waiting to be hashed. Returned to the client as a 503.
+
+    Attributes:
+        wait (int): Seconds the client should wait before retrying (sent as the Retry-After header).
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Server is busy, please try again shortly."
+    default_code = "service_unavailable"
+    wait = 1
+
+
+class PasswordHashingPool:
+    """Runs password hashing (PBKDF2) on a bounded pool of worker processes instead of the request thread.
+
+    At most max_pending hashes can be running or queued at once, any more are rejected with
+    PasswordHashingBusy, so a burst of logins can't tie up every request worker while other
+    endpoints wait. With workers=0 passwords are hashed on the calling thread.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        max_pending (int): Max number of hashes running or queued at once.
+        timeout (float): Seconds to wait for a hash before giving up.
+    """
+
+    def __init__(self, workers=2, max_pending=8, timeout=30):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Started on first use, so processes that never hash a password don't spawn workers
+        with self._lock:
+            if self._executor is None:
+                # Spawned (not forked) so the workers don't inherit open database connections or locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def run(self, func, *args):
+        """Runs a function on the worker pool and waits for its result.
+
+        Args:
+            func (callable): A picklable (module level) function.
+            *args: Arguments passed to func.
+
+        Raises:
+            PasswordHashingBusy: max_pending hashes are already pending, or the result took longer than timeout.
+
+        Returns:
+            any: The function's return value.
+        """
+        if not self.workers:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_executor()
+            raise PasswordHashingBusy()
+
+        # The slot is freed once the worker is done, even if the caller stopped waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHashingBusy()
+        except BrokenProcessPool:
+            # A worker died, start a new pool for the next request
+            self._reset_executor()
+            raise PasswordHashingBusy()
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def make_password(self, password):
+        return self.run(hashers.make_password, password)
+
+    def check_password(self, password, encoded):
+        return self.run(hashers.check_password, password, encoded)
+
+    def shutdown(self):
+        self._reset_executor()
+
+
+# Shared by login, registration and password changes
+password_hashing_pool = PasswordHashingPool(
+    workers=settings.PASSWORD_HASHING_POOL["WORKERS"],
+    max_pending=settings.PASSWORD_HASHING_POOL["MAX_PENDING"],
+    timeout=settings.PASSWORD_HASHING_POOL["TIMEOUT"],
+)
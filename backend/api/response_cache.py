@@ -0,0 +1,194 @@
+# api/response_cache.py
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+
+"""
+CLASSES:
+CachedJSONResponse, ListingResponseCache
+"""
+
+
+class CachedJSONResponse(HttpResponse):
+    """A JSON response served from ListingResponseCache, gzipped if the client accepts it.
+
+    Attributes:
+        data (any): The decoded JSON body (decoded on access, like Response.data).
+    """
+
+    def __init__(self, body, gzip_body, request):
+        # Bodies were compressed once when cached, not once per request
+        accepts_gzip = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+        super().__init__(gzip_body if accepts_gzip else body, content_type="application/json")
+        self._json_body = body
+        self["Vary"] = "Accept-Encoding"
+        if accepts_gzip:
+            self["Content-Encoding"] = "gzip"
+
+    @property
+    def data(self):
+        return json.loads(self._json_body)
+
+
+class ListingResponseCache:
+    """Caches rendered listing feed pages, keyed by their normalized query params.
+
+    Every entry remembers the listings on the page and the listing fields its filters, search and
+    ordering read, so a listing write only invalidates the pages it can change:
+        -Creating or deleting a listing invalidates every page.
+        -Updating a listing (or its likes/dislikes) invalidates the pages it is on and the pages
+         that filter, search or order by one of the updated fields.
+
+    Bodies are stored rendered and gzipped. The backend is any cache object with get/set/delete/clear
+    (ex. db_utils.caches.LRUCache), entries are only served while this process still tracks them.
+
+    Attributes:
+        backend (object): Stores the rendered bodies.
+        max_entries (int): Max number of pages tracked, the least recently cached are dropped first.
+    """
+
+    # Feed params -> the listing fields they read
+    param_fields = {
+        "min_price": {"price"},
+        "max_price": {"price"},
+        "min_likes": {"likes"},
+        "max_dislikes": {"dislikes"},
+        "condition": {"condition"},
+        "author_id": {"author_id"},
+        "tags": {"tags"},
+        "search": {"title", "description", "tags"},
+    }
+
+    def __init__(self, backend, max_entries=512):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (listing ids on the page, fields the page depends on)
+        self._lock = threading.Lock()
+        # Incremented by every invalidation, see set()
+        self.generation = 0
+
+    def make_key(self, query_params, origin=""):
+        """Normalizes query params (param order, repeated values) into a cache key.
+
+        Args:
+            query_params (QueryDict): The request's query params.
+            origin (str, optional): The request's scheme and host (ex. "https://example.com"). Cached pages
+                hold absolute pagination links built from them, so each origin gets its own entries.
+
+        Returns:
+            str: The cache key.
+        """
+        params = sorted((param, sorted(query_params.getlist(param))) for param in query_params.keys())
+        return "listings:" + json.dumps([origin, params])
+
+    def get_dependencies(self, query_params):
+        """Gets the listing fields a page's contents depend on, besides the listings shown on it.
+
+        Args:
+            query_params (QueryDict): The request's query params.
+
+        Returns:
+            set: The field names.
+        """
+        fields = set()
+        for param in query_params.keys():
+            fields |= self.param_fields.get(param, set())
+
+        ordering = query_params.get("ordering")
+        if ordering:
+            field = ordering.lstrip("-")
+            # Relevance is computed from the searched fields
+            fields |= self.param_fields["search"] if field == "relevance" else {field}
+        return fields
+
+    def get(self, key, request):
+        """Gets a cached page.
+
+        Args:
+            key (str): The page's cache key.
+            request (Request): DRF request object, used to pick the encoding.
+
+        Returns:
+            CachedJSONResponse: The cached response, or None.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+
+        bodies = self.backend.get(key)
+        if bodies is None:
+            return None
+        return CachedJSONResponse(*bodies, request)
+
+    def set(self, key, data, query_params, generation):
+        """Renders, compresses and caches a page.
+
+        Args:
+            key (str): The page's cache key.
+            data (dict): The page's response data.
+            query_params (QueryDict): The request's query params.
+            generation (int): The cache's generation when the page was queried. If a write invalidated
+                anything since, the page may already be stale and isn't cached.
+        """
+        results = data.get("results", []) if isinstance(data, dict) else data
+        listing_ids = {listing["id"] for listing in results}
+        body = JSONRenderer().render(data)
+        gzip_body = gzip.compress(body)
+
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (listing_ids, self.get_dependencies(query_params))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.backend.delete(evicted_key)
+            self.backend.set(key, (body, gzip_body))
+
+    def invalidate(self, listing_ids, fields):
+        """Drops the pages a listing write can change. Registered as a listener on the listing queries.
+
+        Args:
+            listing_ids (list): The written listings, None if every listing may have changed.
+            fields (set): The written fields, None if listings were created or deleted.
+        """
+        with self._lock:
+            self.generation += 1
+            if listing_ids is None or fields is None:
+                stale_keys = list(self._entries)
+            else:
+                listing_ids = set(listing_ids)
+                stale_keys = [
+                    key
+                    for key, (page_ids, dependencies) in self._entries.items()
+                    if page_ids & listing_ids or dependencies & fields
+                ]
+            for key in stale_keys:
+                del self._entries[key]
+                self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.backend.clear()
+
+
+def get_listing_response_cache():
+    """Creates the listing response cache from the LISTING_RESPONSE_CACHE setting.
+
+    Returns:
+        ListingResponseCache: The cache, or None if it is disabled.
+    """
+    config = settings.LISTING_RESPONSE_CACHE
+    if not config["ENABLED"]:
+        return None
+
+    backend = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+    return ListingResponseCache(backend, max_entries=config["MAX_ENTRIES"])
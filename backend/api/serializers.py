@@ -1,9 +1,10 @@
 # api/serializers.py
 """
 CLASSES:
-LoginSerializer, UserSerializer, ListingSerializer
+LoginSerializer, UserSerializer, ListingSerializer, ReadOnlyListSerializer, UserListSerializer, ListingListSerializer
 """
 
+from operator import attrgetter, itemgetter
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
@@ -31,7 +32,7 @@ class LoginSerializer(TokenObtainPairSerializer):
             attrs (dict): A dictionary containing the username and password provided by the user.
 
         Returns:
-            dict: The validated attributes (username and password), which will be used for token generation.
+            dict: The validated attributes (username and password) and the validated user (user), which will be used for token generation.
 
         Raises:
             AuthenticationFailed: If the credentials are invalid or do not match any user.
@@ -44,6 +45,9 @@ class LoginSerializer(TokenObtainPairSerializer):
 
         if user is None:
             raise AuthenticationFailed("Invalid credentials.")
+
+        # Carried through to token creation, so a login only reads the user once
+        attrs["user"] = user
         return attrs
 
 
@@ -147,4 +151,86 @@ class ListingSerializer(serializers.Serializer):
         image = instance.image
         if image:
             representation["image"] = image
-        return representation
\ No newline at end of file
+        return representation
+
+
+# Read-only list serializers
+class ReadOnlyListSerializer:
+    """Fast read-only serializer for list responses.
+
+    Builds the same dicts as the DRF serializer it mirrors, but copies the fields out of each row with
+    one precompiled getter instead of calling every field's get_attribute/to_representation. Only
+    used for output, so there is no validation. Accepts query rows (dicts) or model instances.
+
+    Attributes:
+        fields (tuple): The output field names, in order.
+        empty_as_null (tuple): Fields returned as None when empty (ex. an image that was never uploaded).
+    """
+
+    fields = ()
+    empty_as_null = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Compiled once per class, not once per row
+        cls.row_getter = itemgetter(*cls.fields)
+        cls.instance_getter = attrgetter(*cls.fields)
+
+    def __init__(self, instance, many=False):
+        self.instance = instance
+        self.many = many
+
+    @property
+    def data(self):
+        if self.many:
+            return self.to_representation_many(self.instance)
+        return self.to_representation_many([self.instance])[0]
+
+    @classmethod
+    def to_representation_many(cls, instances):
+        """Serializes a list of rows or instances.
+
+        Args:
+            instances (iterable): Query rows (dicts) or model instances, not mixed.
+
+        Returns:
+            list: A dict per row/instance.
+        """
+        instances = list(instances)
+        if not instances:
+            return []
+
+        getter = cls.row_getter if isinstance(instances[0], dict) else cls.instance_getter
+        fields = cls.fields
+        representations = [dict(zip(fields, getter(instance))) for instance in instances]
+        for field in cls.empty_as_null:
+            for representation in representations:
+                if not representation[field]:
+                    representation[field] = None
+        return representations
+
+
+class UserListSerializer(ReadOnlyListSerializer):
+    """Read-only version of UserSerializer for user lists."""
+
+    fields = ("id", "username", "location", "email", "image")
+    empty_as_null = ("image",)
+
+
+class ListingListSerializer(ReadOnlyListSerializer):
+    """Read-only version of ListingSerializer for listing lists."""
+
+    fields = (
+        "id",
+        "title",
+        "condition",
+        "description",
+        "price",
+        "image",
+        "likes",
+        "dislikes",
+        "tags",
+        "created_at",
+        "author_id",
+    )
+    empty_as_null = ("image",)
@@ -0,0 +1,64 @@
+# api/streaming.py
+from itertools import islice
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
+
+"""
+CLASSES:
+StreamingJSONResponse
+"""
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """Streams a JSON array built from a row iterator, a chunk of rows at a time.
+
+    Used for unpaginated lists, so only one chunk of rows is serialized and held in memory at
+    once however large the result is. The rows are usually a streamed query
+    (ex. SQLiteDBQuery.get_filtered_listings(stream=True)), which fetches them a batch at a time
+    and is closed with the response, so a client disconnecting mid-stream stops the fetching.
+
+    The body matches what JSONRenderer would render for the same list (compact, UTF-8).
+
+    Attributes:
+        chunk_size (int): Number of rows serialized and written at a time.
+    """
+
+    chunk_size = 500
+
+    def __init__(self, rows, serialize=None, key=None, status=status.HTTP_200_OK):
+        """
+        Args:
+            rows (iterable): The rows to stream.
+            serialize (callable, optional): Turns a list of rows into a list of JSON serializable
+                objects (ex. ListingListSerializer.to_representation_many). Rows are written as is otherwise.
+            key (str, optional): Wrap the array in an object under this key (ex. {"favorites": [...]}).
+            status (int, optional): The HTTP status. Defaults to 200.
+        """
+        self.rows = iter(rows)
+        super().__init__(self.render_chunks(serialize, key), content_type="application/json", status=status)
+
+    def render_chunks(self, serialize, key):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        yield ("{" + encoder.encode(key) + ":[").encode() if key else b"["
+        separator = b""
+        while True:
+            chunk = list(islice(self.rows, self.chunk_size))
+            if not chunk:
+                break
+            if serialize:
+                chunk = serialize(chunk)
+            # Encode the chunk as one array and drop its brackets
+            yield separator + encoder.encode(chunk)[1:-1].encode()
+            separator = b","
+        yield b"]}" if key else b"]"
+
+    def close(self):
+        # The server closes the response once it's written or the client went away, which stops the query
+        # (even if the body was never iterated, ex. a HEAD request)
+        try:
+            close = getattr(self.rows, "close", None)
+            if close:
+                close()
+        finally:
+            super().close()
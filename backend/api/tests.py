@@ -1,17 +1,41 @@
 # api/tests.py
+import gzip
+import json
 import os
-from io import BytesIO
+import sqlite3
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import override_settings
+from django.core.management import call_command
+from django.http import HttpResponse, QueryDict
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
 from PIL import Image
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase
-from api.handlers import ListingHandler, UserHandler
+from api.authentication import token_cache, user_cache
+from api.handlers import ListingHandler, UserHandler, db_query
 from api.models import Listing, User
-from api.serializers import ListingSerializer, LoginSerializer, UserSerializer
+from api.password_hashing import PasswordHashingBusy, PasswordHashingPool, password_hashing_pool
+from api.response_cache import CachedJSONResponse, ListingResponseCache
+from api.serializers import ListingListSerializer, ListingSerializer, LoginSerializer, UserListSerializer, UserSerializer
+from api.streaming import StreamingJSONResponse
 from api.views import ListingViewSet
 from backend.settings import BASE_DIR
+from db_utils.caches import LRUCache
+from db_utils.connections import SQLiteConnectionPool
+from db_utils.db_factory import sqlite_pragma_profiles
+from db_utils.middleware import RequestTransactionMiddleware
+from db_utils.migrator import MigrationRunner, split_sql_statements
+from db_utils.queries import listing_converters
+from db_utils.row_mappers import RowMapper
+from db_utils.sequences import LazyQuerySequence
+from db_utils.write_behind import ListingCounterBuffer
+from user_messages.models import Message
 
 
 # Functions/Classes to help setup Tests
@@ -105,6 +129,18 @@ class AuthenticatedListingAPITestCase(AuthenticatedAPITestCase):
         response = self.client.post(self.listing_list_url, data, format="multipart")
         return response
 
+    def _walk_cursor_pages(self, url):
+        """Follows the next links from a cursor paginated listing url and returns the listings of every page."""
+        listings = []
+        pages = 0
+        while url and pages < 100:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            listings.extend(response.data.get("results"))
+            url = response.data.get("links").get("next")
+            pages += 1
+        return listings
+
     def _create_test_listings(
         self, num_listings=1, base_title="TestListing", condition="Well Worn", price=10
     ):
@@ -188,6 +224,92 @@ class ListListingsAPITestCase(AuthenticatedListingAPITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreaterEqual(len(response.data.get("results")), 0)
 
+    def test_get_listings_conditional_get(self):
+        response = self.client.get(self.listing_list_url)
+        etag = response["ETag"]
+
+        # Unchanged -> 304
+        response = self.client.get(self.listing_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Any listing write changes the feed's ETag
+        self._create_test_listings(1)
+        response = self.client.get(self.listing_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_get_listings_if_modified_since_is_not_trusted(self):
+        # Both writes happen within the same second, so they have the same Last-Modified
+        with mock.patch("db_utils.queries.time") as mock_time:
+            mock_time.time.return_value = 1700000000.25
+            self._create_test_listings(1)
+            response = self.client.get(self.listing_list_url)
+            last_modified = response["Last-Modified"]
+
+            mock_time.time.return_value = 1700000000.75
+            self._create_test_listings(1)
+
+        # Only the ETag can answer with a 304
+        response = self.client.get(self.listing_list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_listings_sees_writes_from_other_processes(self):
+        self._create_test_listings(1)
+        user = self.user_handler.get_user_by_username("TestUsername")
+        url = f"{self.listing_list_url}?author_id={user.id}"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIsInstance(self.client.get(url), CachedJSONResponse)
+
+        # Another worker process renames the listing, none of this process' versions or caches know about it
+        with db_query.db_connection.transaction() as db:
+            db.execute_query("UPDATE Listing SET title = 'Renamed Elsewhere' WHERE id = ?", (self.listing_ids[0],))
+            db.execute_query("UPDATE ListingVersion SET version = version + 1 WHERE id = 1")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIsInstance(response, CachedJSONResponse)
+        self.assertEqual(response.data.get("results")[0]["title"], "Renamed Elsewhere")
+
+    def test_get_listings_response_cache(self):
+        self._create_test_listings(2)
+        user = self.user_handler.get_user_by_username("TestUsername")
+        url = f"{self.listing_list_url}?author_id={user.id}"
+
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertIsInstance(second, CachedJSONResponse)
+        self.assertEqual(second.data, first.json())
+
+        # Precompressed body for clients that accept gzip
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.content)), first.json())
+
+        # Liking a listing on the page invalidates it
+        self.client.post(reverse("listing-like-listing", args=[self.listing_ids[0]]))
+        response = self.client.get(url)
+        self.assertNotIsInstance(response, CachedJSONResponse)
+        likes = {listing["id"]: listing["likes"] for listing in response.data["results"]}
+        self.assertEqual(likes[self.listing_ids[0]], 1)
+
+    def test_get_listings_response_cache_is_per_host(self):
+        self._create_test_listings(2)
+        user = self.user_handler.get_user_by_username("TestUsername")
+
+        for query in ["page_size=1", "pagination=cursor&page_size=1"]:
+            url = f"{self.listing_list_url}?author_id={user.id}&{query}"
+            # A forged Host header can't put its links into the page cached for other clients
+            response = self.client.get(url, HTTP_HOST="evil.example")
+            self.assertIn("//evil.example/", response.json()["links"]["next"])
+
+            response = self.client.get(url, HTTP_HOST="localhost")
+            self.assertNotIsInstance(response, CachedJSONResponse)
+            self.assertIn("//localhost/", response.json()["links"]["next"])
+            response = self.client.get(url, HTTP_HOST="localhost")
+            self.assertIsInstance(response, CachedJSONResponse)
+            self.assertIn("//localhost/", response.json()["links"]["next"])
+
     def test_unauthenticated_get_listings(self):
         # Stop including any credentials
         self.client.credentials()  # Clears credentials
@@ -330,6 +452,78 @@ class ListListingsAPITestCase(AuthenticatedListingAPITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data.get("error"), "Invalid ordering parameter.")
 
+    # Test cursor (keyset) pagination
+    def test_cursor_pagination_visits_every_listing_once(self):
+        self._create_test_listings(7)
+
+        listings = self._walk_cursor_pages(f"{self.listing_list_url}?pagination=cursor&page_size=3")
+        ids = [listing["id"] for listing in listings]
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertTrue(set(self.listing_ids).issubset(ids))
+        self.assertEqual(len(ids), self.client.get(self.listing_list_url).data.get("count"))
+
+    def test_cursor_pagination_keeps_ordering_across_pages(self):
+        self._create_test_listings(4, price=5)
+
+        listings = self._walk_cursor_pages(f"{self.listing_list_url}?pagination=cursor&page_size=2&ordering=-price")
+        prices = [float(listing["price"]) for listing in listings]
+
+        self.assertEqual(prices, sorted(prices, reverse=True))
+        self.assertEqual(len(listings), len({listing["id"] for listing in listings}))
+
+    def test_cursor_pagination_rejects_unindexed_ordering(self):
+        response = self.client.get(f"{self.listing_list_url}?pagination=cursor&ordering=-description")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data.get("error"), "Invalid ordering parameter for cursor pagination.")
+
+        # Unpaginated lists stream through the same seeks
+        response = self.client.get(f"{self.listing_list_url}?pagination=none&ordering=description")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data.get("error"), "Invalid ordering parameter for unpaginated lists.")
+
+        # Page number pagination still accepts it
+        response = self.client.get(f"{self.listing_list_url}?ordering=-description")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{self.listing_list_url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data.get("detail"), "Invalid cursor.")
+
+    def test_unpaginated_listings_are_streamed(self):
+        self._create_test_listings(3)
+        user = self.user_handler.get_user_by_username("TestUsername")
+        url = f"{self.listing_list_url}?author_id={user.id}&ordering=-price"
+
+        response = self.client.get(f"{url}&pagination=none")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        listings = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(listings, self.client.get(url).json()["results"])
+
+    @mock.patch.object(StreamingJSONResponse, "chunk_size", 1)
+    @mock.patch.object(type(db_query), "stream_batch_size", 2)
+    def test_unpaginated_listings_hold_no_connection_while_read(self):
+        # Same price for every listing, so the batches seek through the id tie breaker
+        self._create_test_listings(5)
+        user = self.user_handler.get_user_by_username("TestUsername")
+        url = f"{self.listing_list_url}?author_id={user.id}&ordering=-price"
+        expected = self.client.get(url).json()["results"]
+        self.assertEqual(len(expected), 5)
+        pool = db_query.db_connection
+        checked_out = pool._num_connections - pool._idle.qsize()
+
+        # Each batch is its own short query, so nothing stays checked out between the chunks a client reads
+        for client in [self.client, APIClient()]:
+            response = client.get(f"{url}&pagination=none")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            chunks = []
+            for chunk in response.streaming_content:
+                self.assertEqual(pool._num_connections - pool._idle.qsize(), checked_out)
+                chunks.append(chunk)
+            self.assertEqual(json.loads(b"".join(chunks)), expected)
+
 
 # Bennett test case 2a:
 # python manage.py test api.tests.SearchListingsAPITestCase
@@ -384,6 +578,78 @@ class SearchListingsAPITestCase(AuthenticatedListingAPITestCase):
         # Assert that no listings have the given search term
         self.assertEqual(len(response.data.get("results")), 0)
 
+    def test_searching_by_tag_keeps_all_tags(self):
+        self._create_test_listings(1, base_title="Interesting Textbook")
+
+        response = self.client.get(f"{self.listing_list_url}?search=development")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        listing = next(
+            listing for listing in response.data.get("results") if listing["id"] == self.listing_ids[0]
+        )
+        self.assertEqual(sorted(listing["tags"]), ["Development", "Test", "Testing"])
+
+    def test_searching_ordered_by_relevance(self):
+        # One listing mentions the term in its title, the other only in its description
+        for title, description in [("Used lamp", "Goes well with a xylophonic desk"), ("Xylophonic Lamp", "A lamp")]:
+            data = {
+                "title": title,
+                "description": description,
+                "price": 10,
+                "image": self._generate_test_image(),
+                "tags": ["Test"],
+                "condition": "Fair",
+            }
+            response = self.client.post(self.listing_list_url, data, format="multipart")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.listing_ids.append(response.data.get("id"))
+
+        response = self.client.get(f"{self.listing_list_url}?search=xylophonic&ordering=relevance")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [listing["title"] for listing in response.data.get("results")]
+        self.assertEqual(titles[:2], ["Xylophonic Lamp", "Used lamp"])
+
+    def test_fuzzy_search_tolerates_typos(self):
+        self._create_test_listings(1, base_title="Calculus Textbook")
+
+        # Full text search doesn't find the misspelled term
+        response = self.client.get(f"{self.listing_list_url}?search=calculas")
+        self.assertNotIn(self.listing_ids[0], [listing["id"] for listing in response.data.get("results")])
+
+        response = self.client.get(f"{self.listing_list_url}?search=calculas&search_mode=fuzzy")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(self.listing_ids[0], [listing["id"] for listing in response.data.get("results")])
+
+    def test_fuzzy_search_runs_once_per_page(self):
+        self._create_test_listings(3, base_title="Calculus Textbook")
+
+        with mock.patch.object(db_query, "get_fuzzy_matches", wraps=db_query.get_fuzzy_matches) as get_fuzzy_matches:
+            response = self.client.get(f"{self.listing_list_url}?search=calculas&search_mode=fuzzy&page_size=2")
+
+        # The count and the page share one fuzzy search
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(response.data.get("count"), 3)
+        self.assertEqual(get_fuzzy_matches.call_count, 1)
+
+    def test_fuzzy_search_cursor_pagination(self):
+        self._create_test_listings(5, base_title="Calculus Textbook")
+
+        listings = self._walk_cursor_pages(
+            f"{self.listing_list_url}?search=calculas&search_mode=fuzzy&pagination=cursor&page_size=2"
+        )
+        ids = [listing["id"] for listing in listings]
+
+        # Every page follows on from the previous one's similarity rank
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertTrue(set(self.listing_ids).issubset(ids))
+        response = self.client.get(f"{self.listing_list_url}?search=calculas&search_mode=fuzzy&page_size=50")
+        self.assertEqual(ids, [listing["id"] for listing in response.data.get("results")])
+
+    def test_invalid_search_mode(self):
+        response = self.client.get(f"{self.listing_list_url}?search=book&search_mode=regex")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data.get("error"), "Invalid search_mode parameter.")
+
 
 # Bennett test case 2b:
 # python manage.py test api.tests.FilterListingsAPITestCase
@@ -563,6 +829,59 @@ class FilterListingsAPITestCase(AuthenticatedListingAPITestCase):
             )
         )
 
+    def test_filtering_by_tags(self):
+        # Create 3 listings with overlapping tags
+        self._create_test_listings(3, "TestListing")
+        db_query.partial_update_listing(self.listing_ids[0], {"tags": ["FilterTagA"]})
+        db_query.partial_update_listing(self.listing_ids[1], {"tags": ["FilterTagA", "FilterTagB"]})
+        db_query.partial_update_listing(self.listing_ids[2], {"tags": ["FilterTagB"]})
+
+        # Any of the tags (default)
+        response = self.client.get(f"{self.listing_list_url}?tags=FilterTagA,FilterTagB")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(listing["id"] for listing in response.data.get("results")),
+            sorted(self.listing_ids),
+        )
+
+        # All of the tags
+        response = self.client.get(f"{self.listing_list_url}?tags=FilterTagA&tags=FilterTagB&tags_match=all")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [listing["id"] for listing in response.data.get("results")],
+            [self.listing_ids[1]],
+        )
+
+    def test_listing_facets(self):
+        facets_url = reverse("listing-facets")
+        self._create_test_listings(1, "TestListing", condition="Factory New", price=10)
+        self._create_test_listings(2, "TestListing", condition="Fair", price=30)
+        for listing_id in self.listing_ids:
+            db_query.partial_update_listing(listing_id, {"tags": ["FacetTag", "Test"]})
+
+        response = self.client.get(f"{facets_url}?tags=FacetTag")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(response.data["conditions"], {"Factory New": 1, "Fair": 2})
+        self.assertEqual(response.data["price_buckets"][0], {"min": 0, "max": 25, "count": 1})
+        self.assertEqual(response.data["price_buckets"][1], {"min": 25, "max": 50, "count": 2})
+        self.assertEqual(
+            response.data["tags"],
+            [{"name": "FacetTag", "count": 3}, {"name": "Test", "count": 3}],
+        )
+
+        # Cached counts are invalidated by listing writes
+        self._create_test_listings(1, "TestListing", condition="Fair", price=30)
+        db_query.partial_update_listing(self.listing_ids[-1], {"tags": ["FacetTag"]})
+        response = self.client.get(f"{facets_url}?tags=FacetTag")
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(response.data["conditions"], {"Factory New": 1, "Fair": 3})
+
+    def test_filtering_by_invalid_tags_match(self):
+        response = self.client.get(f"{self.listing_list_url}?tags=Test&tags_match=some")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data.get("error"), "Invalid tags_match parameter.")
+
     def test_filtering_by_invalid_field(self):
         response = self.client.get(f"{self.listing_list_url}?free=True")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -764,6 +1083,68 @@ class LikeListingTestCase(AuthenticatedAPITestCase):
             f"Expected status 404, got {response.status_code}.",
         )
 
+    # Case: many users liking at the same time - no likes are lost
+    def test_concurrent_likes_not_lost(self):
+        handler = ListingHandler()
+        errors = []
+
+        def like_many():
+            try:
+                for _ in range(25):
+                    response = handler.like_listing(self.listing_id)
+                    if response.status_code != status.HTTP_204_NO_CONTENT:
+                        errors.append(response.data)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=like_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(ListingHandler().get_listing(self.listing_id).likes, 200)
+
+    # Case: buffered likes are coalesced and written on flush
+    def test_buffered_likes_flushed(self):
+        buffer = ListingCounterBuffer(db_query, flush_interval_ms=60000)
+        threads = [
+            threading.Thread(target=lambda: [buffer.add(self.listing_id, likes=1, dislikes=1) for _ in range(50)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Nothing is written until the buffer flushes
+        self.assertEqual(ListingHandler().get_listing(self.listing_id).likes, 0)
+        self.assertEqual(buffer.flush(), 1)
+
+        updated_listing = ListingHandler().get_listing(self.listing_id)
+        self.assertEqual(updated_listing.likes, 200)
+        self.assertEqual(updated_listing.dislikes, 200)
+
+    # Case: failed flushes keep the increments, until too many fail in a row
+    def test_buffered_likes_dropped_after_repeated_failures(self):
+        buffer = ListingCounterBuffer(db_query, flush_interval_ms=60000, max_failures=3)
+        buffer.add(self.listing_id, likes=2)
+
+        with mock.patch.object(db_query, "increment_listing_counters", side_effect=sqlite3.OperationalError("locked")):
+            for _ in range(2):
+                with self.assertRaises(sqlite3.OperationalError):
+                    buffer.flush()
+                self.assertEqual(buffer._pending, {self.listing_id: (2, 0)})
+
+            with self.assertRaises(sqlite3.OperationalError), mock.patch("builtins.print") as mock_print:
+                buffer.flush()
+            self.assertEqual(buffer._pending, {})
+            mock_print.assert_called_once()
+
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(ListingHandler().get_listing(self.listing_id).likes, 0)
+
 
 """
 TEST CLASS: FavoriteListingTestCase
@@ -1202,7 +1583,940 @@ class RetrieveListingTestCase(AuthenticatedAPITestCase):
             f"Expected status 404, got {response.status_code}.",
         )
 
+    def test_retrieve_listing_tags_after_update(self):
+        # Tags are stored on the listing row, so they must follow the create and update paths
+        response = self.client.get(self.detail_listing_url)
+        self.assertEqual(
+            sorted(response.data["tags"]), ["Development", "Test", "Testing"]
+        )
+
+        self.client.patch(
+            self.detail_listing_url, {"tags": ["Updated", "Tags"]}, format="multipart"
+        )
+        response = self.client.get(self.detail_listing_url)
+        self.assertEqual(response.data["tags"], ["Updated", "Tags"])
+
+    def test_retrieve_listing_conditional_get(self):
+        response = self.client.get(self.detail_listing_url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        # Unchanged -> 304
+        response = self.client.get(self.detail_listing_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Liking this listing does
+        self.client.post(reverse("listing-like-listing", args=[self.listing_ids[0]]))
+        response = self.client.get(self.detail_listing_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_tag_update_statement_count_is_constant(self):
+        def count_statements(tags):
+            statements = []
+            with db_query.db_connection as db:
+                db.connection.set_trace_callback(statements.append)
+                try:
+                    db_query.partial_update_listing(self.listing_ids[0], {"tags": tags})
+                finally:
+                    db.connection.set_trace_callback(None)
+            # Only count statements against the tag tables (the search index runs its own internal SQL)
+            return len([sql for sql in statements if any(table in sql for table in ["ListingTag", "FROM Tag", "INTO Tag"])])
+
+        few_tags = count_statements([f"FewTag{i}" for i in range(2)])
+        many_tags = count_statements([f"ManyTag{i}" for i in range(10)])
+        self.assertEqual(few_tags, many_tags)
+
+        # Nothing changed, so only the current tag set is read
+        self.assertEqual(count_statements([f"ManyTag{i}" for i in range(10)]), 1)
+
     # teardown function
     def tearDown(self):
         self._delete_test_listings()
         super().tearDown()
+
+
+
+"""
+TEST CLASS: SQLite Connection Pool Testcase
+-run:
+python manage.py test api.tests.SQLiteConnectionPoolTestCase
+"""
+class SQLiteConnectionPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_config = {
+            "NAME": os.path.join(self.temp_dir.name, "pool_test.sqlite3"),
+            "POOL_SIZE": 3,
+            "POOL_TIMEOUT": 5,
+        }
+        self.pool = SQLiteConnectionPool(db_config)
+        self.pool.execute_query("CREATE TABLE Counter (id INTEGER PRIMARY KEY, value INTEGER)")
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.temp_dir.cleanup()
+
+    def test_connection_reused_between_blocks(self):
+        with self.pool as db:
+            first_connection = db.connection
+        with self.pool as db:
+            second_connection = db.connection
+
+        self.assertIs(first_connection, second_connection)
+        self.assertIsNone(self.pool.connection)
+
+    def test_nested_blocks_share_connection(self):
+        with self.pool as outer:
+            outer_connection = outer.connection
+            with self.pool as inner:
+                self.assertIs(inner.connection, outer_connection)
+            # Leaving the inner block must not return the outer block's connection
+            self.assertIs(self.pool.connection, outer_connection)
+        self.assertIsNone(self.pool.connection)
+
+    def test_threads_never_exceed_pool_size(self):
+        errors = []
+
+        def worker(worker_id):
+            try:
+                for i in range(20):
+                    with self.pool as db:
+                        db.execute_query("INSERT INTO Counter (value) VALUES (?)", (worker_id * 100 + i,))
+                        db.execute_query("SELECT COUNT(*) FROM Counter")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(self.pool._num_connections, 3)
+        rows = self.pool.execute_query("SELECT COUNT(*) AS total FROM Counter")
+        self.assertEqual(rows[0]["total"], 160)
+
+    def test_pragma_profile_applied(self):
+        db_config = {
+            "NAME": os.path.join(self.temp_dir.name, "pragma_test.sqlite3"),
+            "PRAGMAS": sqlite_pragma_profiles["production"],
+        }
+        pool = SQLiteConnectionPool(db_config)
+
+        with pool as db:
+            journal_mode = db.connection.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = db.connection.execute("PRAGMA synchronous").fetchone()[0]
+        pool.close_all()
+
+        self.assertEqual(journal_mode.lower(), "wal")
+        self.assertEqual(synchronous, 1)  # 1 = NORMAL
+
+    def _insert_counters(self, count):
+        with self.pool as db:
+            db.connection.executemany("INSERT INTO Counter (value) VALUES (?)", [(i,) for i in range(count)])
+            db.connection.commit()
+
+    def test_stream_fetches_rows_in_batches(self):
+        self._insert_counters(25)
+
+        stream = self.pool.stream_query("SELECT value FROM Counter ORDER BY id", batch_size=10, convert=lambda row: row["value"])
+        stream.cursor = mock.Mock(wraps=stream.cursor)
+        values = list(stream)
+
+        self.assertEqual(values, list(range(25)))
+        # 3 batches, then an empty fetch ends the stream
+        self.assertEqual(stream.cursor.fetchmany.call_count, 4)
+        self.assertTrue(stream.closed)
+        self.assertIsNone(self.pool.connection)
+
+    def _checked_out(self):
+        return self.pool._num_connections - self.pool._idle.qsize()
+
+    def test_stream_holds_connection_until_closed(self):
+        self._insert_counters(5)
+
+        stream = self.pool.stream_query("SELECT value FROM Counter", batch_size=2)
+        next(stream)
+        self.assertEqual(self._checked_out(), 1)
+
+        # The stream's connection isn't bound to this thread, other queries check out their own
+        self.assertIsNone(self.pool.connection)
+        with self.pool as db:
+            self.assertIsNot(db.connection, stream.cursor.connection)
+            self.assertEqual(self._checked_out(), 2)
+        self.assertEqual(self._checked_out(), 1)
+
+        stream.close()
+        self.assertEqual(self._checked_out(), 0)
+        with self.assertRaises(StopIteration):
+            next(stream)
+
+    def test_stream_closed_on_another_thread(self):
+        self._insert_counters(5)
+
+        stream = self.pool.stream_query("SELECT value FROM Counter", batch_size=2)
+        next(stream)
+        thread = threading.Thread(target=stream.close)
+        thread.start()
+        thread.join()
+
+        # The exact connection the stream used goes back, and this thread's state is untouched
+        self.assertEqual(self._checked_out(), 0)
+        self.assertIs(self.pool._idle.get_nowait(), stream.cursor.connection)
+        with self.pool as db:
+            self.assertEqual(db.execute_query("SELECT COUNT(*) AS total FROM Counter")[0]["total"], 5)
+        self.assertIsNone(self.pool.connection)
+
+    def test_stream_shares_the_threads_connection(self):
+        self._insert_counters(5)
+
+        with self.pool as db:
+            stream = self.pool.stream_query("SELECT value FROM Counter", batch_size=2)
+            self.assertIs(stream.cursor.connection, db.connection)
+
+        # Leaving the block doesn't return the connection while the stream still reads from it
+        self.assertIsNone(self.pool.connection)
+        self.assertEqual(self._checked_out(), 1)
+        self.assertEqual(len(list(stream)), 5)
+        self.assertEqual(self._checked_out(), 0)
+
+    def test_stream_query_error_releases_connection(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.pool.stream_query("SELECT * FROM MissingTable")
+        self.assertIsNone(self.pool.connection)
+        self.assertEqual(self._checked_out(), 0)
+
+    def _count_committed(self):
+        # Read from another thread, so only committed rows are counted
+        counts = []
+        thread = threading.Thread(
+            target=lambda: counts.append(self.pool.execute_query("SELECT COUNT(*) AS total FROM Counter")[0]["total"])
+        )
+        thread.start()
+        thread.join()
+        return counts[0]
+
+    def test_transaction_commits_once_at_the_end(self):
+        with self.pool.transaction() as db:
+            db.execute_query("INSERT INTO Counter (value) VALUES (1)")
+            # Nested blocks use the same connection and don't commit
+            with self.pool as inner:
+                self.assertIs(inner.connection, db.connection)
+                inner.execute_query("INSERT INTO Counter (value) VALUES (2)")
+            self.assertEqual(self._count_committed(), 0)
+
+        self.assertEqual(self._count_committed(), 2)
+        self.assertIsNone(self.pool.connection)
+
+    def test_transaction_rolls_back_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.pool.transaction() as db:
+                db.execute_query("INSERT INTO Counter (value) VALUES (1)")
+                raise ValueError()
+
+        with self.pool.transaction() as db:
+            db.execute_query("INSERT INTO Counter (value) VALUES (1)")
+            db.set_rollback()
+
+        self.assertEqual(self._count_committed(), 0)
+
+    def test_nested_transactions_are_savepoints(self):
+        committed = []
+        with self.pool.transaction() as db:
+            db.execute_query("INSERT INTO Counter (value) VALUES (1)")
+            with self.assertRaises(ValueError):
+                with db.transaction():
+                    db.execute_query("INSERT INTO Counter (value) VALUES (2)")
+                    db.on_commit(lambda: committed.append("rolled back"))
+                    raise ValueError()
+            with db.transaction():
+                db.execute_query("INSERT INTO Counter (value) VALUES (3)")
+                db.on_commit(lambda: committed.append("inner"))
+            db.on_commit(lambda: committed.append("outer"))
+            # Callbacks wait for the outermost commit
+            self.assertEqual(committed, [])
+
+        rows = self.pool.execute_query("SELECT value FROM Counter ORDER BY value")
+        self.assertEqual([row["value"] for row in rows], [1, 3])
+        self.assertEqual(committed, ["inner", "outer"])
+
+        # Outside of a transaction the callback runs right away
+        self.pool.on_commit(lambda: committed.append("now"))
+        self.assertEqual(committed[-1], "now")
+
+    def test_execute_query_returns_rows_of_any_query_that_has_them(self):
+        # A write's RETURNING rows are returned, and the write is still committed
+        rows = self.pool.execute_query("INSERT INTO Counter (value) VALUES (?), (?) RETURNING id, value", (7, 8))
+        self.assertEqual([row["value"] for row in rows], [7, 8])
+        self.assertEqual(self._count_committed(), 2)
+
+        rows = self.pool.execute_query("WITH doubled AS (SELECT value * 2 AS value FROM Counter) SELECT SUM(value) AS total FROM doubled")
+        self.assertEqual(rows[0]["total"], 30)
+
+        # Other writes return the new row's id
+        row_id = self.pool.execute_query("INSERT INTO Counter (value) VALUES (9)")
+        self.assertEqual(row_id, 3)
+
+    def test_execute_many_commits_once(self):
+        rowcount = self.pool.execute_many("INSERT INTO Counter (value) VALUES (?)", [(i,) for i in range(100)])
+        self.assertEqual(rowcount, 100)
+        self.assertEqual(self._count_committed(), 100)
+
+        # Inside a transaction the scope commits
+        with self.pool.transaction() as db:
+            db.execute_many("UPDATE Counter SET value = value + 1 WHERE id = ?", [(1,), (2,)])
+            db.set_rollback()
+        rows = self.pool.execute_query("SELECT value FROM Counter WHERE id IN (1, 2) ORDER BY id")
+        self.assertEqual([row["value"] for row in rows], [0, 1])
+
+    def test_request_transaction_middleware(self):
+        def view(status_code):
+            def get_response(request):
+                self.pool.execute_query("INSERT INTO Counter (value) VALUES (?)", (status_code,))
+                return HttpResponse(status=status_code)
+            return get_response
+
+        for status_code in [200, 500]:
+            middleware = RequestTransactionMiddleware(view(status_code))
+            middleware.db_connection = self.pool
+            self.assertEqual(middleware(None).status_code, status_code)
+
+        # The 5xx request's write was rolled back
+        rows = self.pool.execute_query("SELECT value FROM Counter")
+        self.assertEqual([row["value"] for row in rows], [200])
+
+
+"""
+TEST CLASS: Lazy Query Sequence Testcase
+-run:
+python manage.py test api.tests.LazyQuerySequenceTestCase
+"""
+class LazyQuerySequenceTestCase(SimpleTestCase):
+    def setUp(self):
+        self.rows = list(range(100))
+        self.fetch_calls = []
+        self.count_calls = 0
+
+        def count_rows():
+            self.count_calls += 1
+            return len(self.rows)
+
+        def fetch_rows(limit, offset):
+            self.fetch_calls.append((limit, offset))
+            if limit is None:
+                return self.rows[offset:]
+            return self.rows[offset:offset + limit]
+
+        self.sequence = LazyQuerySequence(count_rows, fetch_rows)
+
+    def test_slice_only_fetches_requested_rows(self):
+        self.assertEqual(self.sequence[24:36], list(range(24, 36)))
+        self.assertEqual(self.fetch_calls, [(12, 24)])
+
+    def test_count_is_cached(self):
+        self.assertEqual(len(self.sequence), 100)
+        self.assertEqual(self.sequence.count(), 100)
+        self.assertEqual(self.count_calls, 1)
+
+    def test_index_and_iteration(self):
+        self.assertEqual(self.sequence[5], 5)
+        self.assertEqual(self.sequence[-1], 99)
+        self.assertEqual(list(self.sequence), self.rows)
+        with self.assertRaises(IndexError):
+            self.sequence[100]
+
+    def test_listing_feed_is_lazy(self):
+        listings = ListingHandler().list_filtered_listings()
+        self.assertIsInstance(listings, LazyQuerySequence)
+        page = listings[0:12]
+        self.assertLessEqual(len(page), 12)
+        self.assertTrue(all(isinstance(listing, Listing) for listing in page))
+
+
+"""
+TEST CLASS: Migration Runner Testcase
+-run:
+python manage.py test api.tests.MigrationRunnerTestCase
+"""
+class MigrationRunnerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pool = SQLiteConnectionPool({"NAME": os.path.join(self.temp_dir.name, "migration_test.sqlite3")})
+        self.runner = MigrationRunner(self.pool)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.temp_dir.cleanup()
+
+    def test_applies_every_migration_once(self):
+        applied = self.runner.apply_pending()
+        all_versions = [version for version, _, _ in self.runner.get_migrations()]
+
+        self.assertEqual([version for version, _ in applied], all_versions)
+        self.assertEqual(self.runner.get_applied_versions(), set(all_versions))
+        # Running again is a no-op
+        self.assertEqual(self.runner.apply_pending(), [])
+
+    def test_secondary_indexes_used(self):
+        self.runner.apply_pending()
+
+        with self.pool as db:
+            plan = db.connection.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM Message WHERE receiver_id = ?", (1,)
+            ).fetchall()
+        self.assertIn("idx_message_receiver_id", " ".join(row[3] for row in plan))
+
+    def test_keyset_orderings_seek_through_an_index(self):
+        self.runner.apply_pending()
+
+        # Same shape as a cursor page from SQLiteDBQuery.get_filtered_listings
+        for field, index in [
+            ("title", "idx_listing_title"),
+            ("condition", "idx_listing_condition"),
+            ("price", "idx_listing_price"),
+            ("likes", "idx_listing_likes"),
+            ("dislikes", "idx_listing_dislikes"),
+            ("created_at", "idx_listing_created_at"),
+        ]:
+            for operator, direction in [(">", "ASC"), ("<", "DESC")]:
+                with self.pool as db:
+                    plan = db.connection.execute(
+                        f"""
+                        EXPLAIN QUERY PLAN
+                        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes,
+                        l.author_id, l.created_at, l.tags
+                        FROM Listing l
+                        WHERE 1=1 AND (l.{field}, l.id) {operator} (?, ?)
+                        ORDER BY l.{field} {direction}, l.id {direction} LIMIT ? OFFSET ?
+                        """,
+                        (1, 1, 13, 0),
+                    ).fetchall()
+                plan = " ".join(row[3] for row in plan)
+                self.assertIn(index, plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_split_sql_statements_keeps_triggers_whole(self):
+        sql = """
+        -- comment
+        CREATE TABLE A (id INTEGER);
+        CREATE TRIGGER a_trigger AFTER INSERT ON A BEGIN
+            UPDATE A SET id = id;
+        END;
+        """
+        statements = split_sql_statements(sql)
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(statements[1].startswith("CREATE TRIGGER"))
+
+
+
+"""
+TEST CLASS: Authenticated User Cache Testcase
+-run:
+python manage.py test api.tests.UserCacheTestCase
+"""
+class UserCacheTestCase(AuthenticatedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.list_favorites_url = reverse("listing-list-favorite-listings")
+
+    def test_repeated_requests_hit_cache(self):
+        self.client.get(self.list_favorites_url)
+        hits = user_cache.hits
+
+        response = self.client.get(self.list_favorites_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_cache.hits, hits + 1)
+
+    def test_repeated_requests_reuse_verified_token(self):
+        token_cache.clear()
+        self.client.get(self.list_favorites_url)
+        hits = token_cache.hits
+
+        response = self.client.get(self.list_favorites_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.hits, hits + 1)
+
+        # Tampered tokens are never served from the cache
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer invalid.token.value")
+        response = client.get(self.list_favorites_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_not_authenticated(self):
+        # Cache the user, then delete them
+        self.client.get(self.list_favorites_url)
+        user = self.user_handler.get_user_by_username("TestUsername")
+        self.client.delete(reverse("user-detail", args=[user.id]))
+
+        # The old token must not authenticate from the cache
+        response = self.client.get(self.list_favorites_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def tearDown(self):
+        # The deletion test removes the test user itself
+        if db_query.get_user_by_username("TestUsername"):
+            super().tearDown()
+
+
+
+"""
+TEST CLASS: Claims-Only Authentication Testcase
+-run:
+python manage.py test api.tests.ClaimsOnlyAuthenticationTestCase
+"""
+@override_settings(AUTH_CLAIMS_ONLY={"ENABLED": True, "VERSION_CHECK_INTERVAL": 30})
+class ClaimsOnlyAuthenticationTestCase(AuthenticatedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.list_favorites_url = reverse("listing-list-favorite-listings")
+        self.user = self.user_handler.get_user_by_username("TestUsername")
+
+    def test_authenticates_without_user_lookup(self):
+        lookups = user_cache.hits + user_cache.misses
+        for _ in range(3):
+            response = self.client.get(self.list_favorites_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The full user is never loaded
+        self.assertEqual(user_cache.hits + user_cache.misses, lookups)
+
+    def test_updated_user_token_is_rejected(self):
+        self.client.get(self.list_favorites_url)
+        response = self.client.patch(
+            reverse("user-detail", args=[self.user.id]), {"location": "Library"}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # The token was issued for the previous version of the user
+        response = self.client.get(self.list_favorites_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Logging in again issues a token for the new version
+        response = self.user_handler.login({"username": "TestUsername", "password": "TestPassword"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        response = self.client.get(self.list_favorites_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+
+"""
+TEST CLASS: Password Hashing Pool Testcase
+-run:
+python manage.py test api.tests.PasswordHashingPoolTestCase
+"""
+class PasswordHashingPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        self.pool = PasswordHashingPool(workers=1, max_pending=1, timeout=30)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_hashes_on_worker_pool(self):
+        encoded = self.pool.make_password("TestPassword")
+        self.assertTrue(self.pool.check_password("TestPassword", encoded))
+        self.assertFalse(self.pool.check_password("WrongPassword", encoded))
+
+    def test_rejects_when_full(self):
+        # Occupy the only slot
+        worker = threading.Thread(target=self.pool.run, args=(time.sleep, 1))
+        worker.start()
+        time.sleep(0.2)
+
+        with self.assertRaises(PasswordHashingBusy):
+            self.pool.make_password("TestPassword")
+        worker.join()
+
+
+"""
+TEST CLASS: Busy Login Testcase
+-run:
+python manage.py test api.tests.BusyLoginTestCase
+"""
+class BusyLoginTestCase(AuthenticatedAPITestCase):
+    def test_busy_login_returns_503(self):
+        client = APIClient()
+        with mock.patch.object(password_hashing_pool, "check_password", side_effect=PasswordHashingBusy()):
+            response = client.post(
+                reverse("get_token"), {"username": "TestUsername", "password": "TestPassword"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_busy_register_and_password_change_return_503(self):
+        user = self.user_handler.get_user_by_username("TestUsername")
+        with mock.patch.object(password_hashing_pool, "make_password", side_effect=PasswordHashingBusy()):
+            responses = [
+                APIClient().post(
+                    reverse("user-list"), {"username": "BusyUsername", "password": "BusyPassword"}, format="json"
+                ),
+                self.client.patch(reverse("user-detail", args=[user.id]), {"password": "NewPassword"}, format="json"),
+            ]
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response["Retry-After"], "1")
+        self.assertIsNone(db_query.get_user_by_username("BusyUsername"))
+
+
+
+"""
+TEST CLASS: Login Benchmark Testcase
+-run:
+python manage.py test api.tests.LoginBenchmarkTestCase
+"""
+class LoginBenchmarkTestCase(SimpleTestCase):
+    def test_login_reads_user_once(self):
+        out = StringIO()
+        call_command("benchmark_login", iterations=2, stdout=out)
+        self.assertIn("Queries per login: 1.0", out.getvalue())
+
+
+
+"""
+TEST CLASS: Listing Response Cache Testcase
+-run:
+python manage.py test api.tests.ListingResponseCacheTestCase
+"""
+class ListingResponseCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = ListingResponseCache(LRUCache(max_size=10))
+
+    def _cache_page(self, query_string, listing_ids):
+        query_params = QueryDict(query_string)
+        key = self.cache.make_key(query_params)
+        data = {"results": [{"id": listing_id} for listing_id in listing_ids]}
+        self.cache.set(key, data, query_params, self.cache.generation)
+        return key
+
+    def test_keys_are_normalized(self):
+        self.assertEqual(
+            self.cache.make_key(QueryDict("page=2&condition=Fair")),
+            self.cache.make_key(QueryDict("condition=Fair&page=2")),
+        )
+
+    def test_invalidates_only_affected_pages(self):
+        home = self._cache_page("", [1, 2])
+        by_likes = self._cache_page("ordering=-likes", [3, 4])
+        by_price = self._cache_page("ordering=price", [3, 4])
+
+        # Liking listing 1 changes the home page (it's on it) and the pages ordered by likes
+        self.cache.invalidate([1], {"likes"})
+        self.assertEqual(
+            [key for key in [home, by_likes, by_price] if key in self.cache._entries],
+            [by_price],
+        )
+
+        # Creating or deleting a listing changes every page
+        self.cache.invalidate([5], None)
+        self.assertEqual(len(self.cache._entries), 0)
+
+    def test_pages_queried_before_a_write_are_not_cached(self):
+        query_params = QueryDict("")
+        generation = self.cache.generation
+        self.cache.invalidate([1], {"likes"})
+        self.cache.set(self.cache.make_key(query_params), {"results": []}, query_params, generation)
+        self.assertEqual(len(self.cache._entries), 0)
+
+
+
+"""
+TEST CLASS: List Serializer Testcase
+-run:
+python manage.py test api.tests.ListSerializerTestCase
+"""
+class ListSerializerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.listing_rows = [
+            {
+                "id": 1,
+                "title": "Calculus",
+                "condition": "Fair",
+                "description": "Used textbook",
+                "price": 25.5,
+                "image": "/media/listings/calculus",
+                "likes": 3,
+                "dislikes": 1,
+                "tags": ["textbooks", "math"],
+                "created_at": "2024-12-11 03:55:02",
+                "author_id": 1,
+                "relevance": 0.5,
+            },
+            {
+                "id": 2,
+                "title": "Pencils",
+                "condition": "Factory New",
+                "description": "A box of pencils",
+                "price": 4.0,
+                "image": "",
+                "likes": 0,
+                "dislikes": 0,
+                "tags": None,
+                "created_at": "2024-12-12 10:00:00",
+                "author_id": 2,
+            },
+        ]
+
+    def test_listing_output_matches_listing_serializer(self):
+        expected = ListingSerializer([Listing(**row) for row in self.listing_rows], many=True).data
+        # Rows and Listing instances serialize the same
+        self.assertEqual(ListingListSerializer(self.listing_rows, many=True).data, expected)
+        self.assertEqual(
+            ListingListSerializer([Listing(**row) for row in self.listing_rows], many=True).data, expected
+        )
+        self.assertIsNone(expected[1]["image"])
+        self.assertNotIn("relevance", expected[0])
+
+    def test_user_output_matches_user_serializer(self):
+        users = [
+            User(id=1, username="alice", password="hash", location="Quahog", image="/media/users/alice"),
+            User(id=2, username="bob", password="hash"),
+        ]
+        expected = UserSerializer(users, many=True).data
+        self.assertEqual(UserListSerializer(users, many=True).data, expected)
+        self.assertEqual(UserListSerializer(users[0]).data, expected[0])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_serializers", page_size=5, iterations=2, stdout=out)
+        self.assertIn("Speedup:", out.getvalue())
+
+
+
+"""
+TEST CLASS: Streaming JSON Response Testcase
+-run:
+python manage.py test api.tests.StreamingJSONResponseTestCase
+"""
+class StreamingJSONResponseTestCase(SimpleTestCase):
+    def setUp(self):
+        self.rows = [{"id": i, "title": f"Listing {i}", "tags": ["émoji ✓"]} for i in range(7)]
+
+    def _render(self, response):
+        return b"".join(response.streaming_content)
+
+    @mock.patch.object(StreamingJSONResponse, "chunk_size", 3)
+    def test_body_matches_json_renderer(self):
+        response = StreamingJSONResponse(iter(self.rows))
+        self.assertEqual(self._render(response), JSONRenderer().render(self.rows))
+
+        response = StreamingJSONResponse(iter(self.rows), key="favorites")
+        self.assertEqual(self._render(response), JSONRenderer().render({"favorites": self.rows}))
+
+        response = StreamingJSONResponse(iter([]), key="favorites")
+        self.assertEqual(json.loads(self._render(response)), {"favorites": []})
+
+    @mock.patch.object(StreamingJSONResponse, "chunk_size", 3)
+    def test_rows_are_serialized_per_chunk(self):
+        chunks = []
+
+        def serialize(chunk):
+            chunks.append(len(chunk))
+            return [{"id": row["id"]} for row in chunk]
+
+        response = StreamingJSONResponse(iter(self.rows), serialize=serialize)
+        self.assertEqual(json.loads(self._render(response)), [{"id": row["id"]} for row in self.rows])
+        self.assertEqual(chunks, [3, 3, 1])
+
+    @mock.patch.object(StreamingJSONResponse, "chunk_size", 1)
+    def test_closing_the_response_stops_the_query(self):
+        pool = db_query.db_connection
+        checked_out = pool._num_connections - pool._idle.qsize()
+        rows = db_query.get_filtered_listings(stream=True)
+
+        # Opening bracket, then the first listing, the batch it came from already gave its connection back
+        response = StreamingJSONResponse(rows)
+        content = iter(response.streaming_content)
+        next(content)
+        next(content)
+        self.assertEqual(pool._num_connections - pool._idle.qsize(), checked_out)
+
+        # Django closes the response when the client is done (or gone), no more batches are fetched
+        response.close()
+        with self.assertRaises(StopIteration):
+            next(rows)
+
+    def test_closing_an_unread_response_stops_the_query(self):
+        rows = db_query.get_filtered_listings(stream=True)
+        StreamingJSONResponse(rows).close()
+        with self.assertRaises(StopIteration):
+            next(rows)
+
+
+
+"""
+TEST CLASS: Row Mapper Testcase
+-run:
+python manage.py test api.tests.RowMapperTestCase
+"""
+class RowMapperTestCase(SimpleTestCase):
+    def setUp(self):
+        connection = sqlite3.connect(":memory:")
+        connection.row_factory = sqlite3.Row
+        self.rows = connection.execute(
+            """
+            SELECT 1 AS id, 'Calculus' AS title, 'Fair' AS condition, 'Used' AS description, 25.5 AS price,
+            'listings/calculus' AS image, 3 AS likes, 1 AS dislikes, 2 AS author_id, '2024-12-11 03:55:02' AS created_at,
+            '["math"]' AS tags
+            """
+        ).fetchall()
+        connection.close()
+
+    def test_maps_rows_to_dicts(self):
+        mapper = RowMapper.get(self.rows[0].keys(), converters=listing_converters)
+        listing = mapper.map_row(self.rows[0])
+
+        self.assertEqual(list(listing), list(self.rows[0].keys()))
+        self.assertEqual(listing["tags"], ["math"])
+        self.assertEqual(listing["image"], "/media/listings/calculus")
+        self.assertEqual(listing["price"], 25.5)
+
+    def test_maps_rows_to_records(self):
+        listing = RowMapper.get(self.rows[0].keys(), Listing, listing_converters).map_rows(self.rows)[0]
+
+        self.assertIsInstance(listing, Listing)
+        self.assertEqual((listing.id, listing.author_id, listing.created_at), (1, 2, "2024-12-11 03:55:02"))
+        self.assertEqual(listing.tags, ["math"])
+        self.assertIsNone(listing.relevance)
+        self.assertFalse(hasattr(listing, "__dict__"))
+
+        # Columns that don't cover a prefix of the fields are passed by keyword
+        message = RowMapper.get(("content", "id", "receiver_id", "sender_id"), Message).map_row(("Hi", 1, 2, 3))
+        self.assertEqual((message.id, message.sender_id, message.receiver_id, message.content), (1, 3, 2, "Hi"))
+
+    def test_mappers_are_cached_per_query_shape(self):
+        columns = self.rows[0].keys()
+        self.assertIs(RowMapper.get(columns, Listing, listing_converters), RowMapper.get(columns, Listing, listing_converters))
+        self.assertIsNot(RowMapper.get(columns, Listing, listing_converters), RowMapper.get(columns, None, listing_converters))
+
+    def test_single_row_reads_match_list_reads(self):
+        # Lookups by id/username go through the same mappers as the list queries
+        users = db_query.get_all_users(limit=1)
+        if users:
+            self.assertEqual(db_query.get_user_by_id(users[0]["id"]), users[0])
+            self.assertEqual(db_query.get_user_by_username(users[0]["username"]), users[0])
+        listings = db_query.get_filtered_listings(limit=1)
+        if listings:
+            self.assertEqual(db_query.get_listing_by_id(listings[0]["id"]), listings[0])
+        self.assertIsNone(db_query.get_user_by_id(-1))
+        self.assertIsNone(db_query.get_listing_by_id(-1))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_row_mapping", rows=50, iterations=1, stdout=out)
+        self.assertIn("Rows: 50", out.getvalue())
+
+
+
+"""
+TEST CLASS: Bulk Write Testcase
+-run:
+python manage.py test api.tests.BulkWriteTestCase
+"""
+class BulkWriteTestCase(AuthenticatedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.user_handler.get_user_by_username("TestUsername")
+        self.listing_ids = []
+
+    def tearDown(self):
+        for listing_id in self.listing_ids:
+            db_query.delete_listing(listing_id)
+        db_query.db_connection.execute_query("DELETE FROM UserFavoriteListing WHERE user_id = ?", (self.user.id,))
+        db_query.db_connection.execute_query("DELETE FROM Message WHERE sender_id = ?", (self.user.id,))
+        super().tearDown()
+
+    def test_bulk_create_listings(self):
+        listings = [
+            {
+                "title": f"Bulk Listing {i}",
+                "condition": "Fair",
+                "description": "Bulk loaded listing",
+                "price": 10 + i,
+                "image": "listings/bulk",
+                "tags": ["bulkloaded", f"bulk{i}", "bulkloaded"],
+            }
+            for i in range(3)
+        ]
+        self.listing_ids = db_query.bulk_create_listings(listings, self.user.id)
+
+        self.assertEqual(len(self.listing_ids), 3)
+        for i, listing_id in enumerate(self.listing_ids):
+            listing = db_query.get_listing_by_id(listing_id)
+            self.assertEqual(listing["title"], f"Bulk Listing {i}")
+            self.assertEqual(listing["author_id"], self.user.id)
+            self.assertEqual(listing["tags"], ["bulkloaded", f"bulk{i}"])
+
+        # Tags and the search index are written too
+        tagged = db_query.get_filtered_listings({"tags": ["bulkloaded"], "tags_match": "any"})
+        self.assertEqual(sorted(listing["id"] for listing in tagged), self.listing_ids)
+        found = db_query.get_filtered_listings(search_term="bulk1")
+        self.assertEqual([listing["id"] for listing in found], [self.listing_ids[1]])
+        for table in ["ListingSearch", "ListingTrigram"]:
+            rows = db_query.db_connection.execute_query(
+                f"SELECT rowid FROM {table} WHERE rowid IN (SELECT value FROM json_each(?)) ORDER BY rowid",
+                (json.dumps(self.listing_ids),),
+            )
+            self.assertEqual([row[0] for row in rows], self.listing_ids)
+
+    def test_bulk_add_favorites_and_messages(self):
+        self.listing_ids = db_query.bulk_create_listings(
+            [{"title": "Bulk", "condition": "Fair", "description": "Bulk", "price": 1, "image": "listings/bulk"}] * 2,
+            self.user.id,
+        )
+        favorites = [(self.user.id, listing_id) for listing_id in self.listing_ids]
+        self.assertEqual(db_query.bulk_add_favorite_listings(favorites), 2)
+        # Existing favorites are skipped
+        self.assertEqual(db_query.bulk_add_favorite_listings(favorites), 0)
+        favorite_ids = {listing["id"] for listing in db_query.retrieve_favorite_listings(self.user.id)}
+        self.assertEqual(favorite_ids, set(self.listing_ids))
+
+        messages = [(self.user.id, self.user.id, f"Message {i}") for i in range(5)]
+        self.assertEqual(db_query.bulk_create_messages(messages), 5)
+        contents = [message["content"] for message in db_query.get_all_messages(self.user.id)]
+        self.assertEqual(contents, [f"Message {i}" for i in range(5)])
+
+
+
+"""
+TEST CLASS: Message List Testcase
+-run:
+python manage.py test api.tests.MessageListAPITestCase
+"""
+class MessageListAPITestCase(AuthenticatedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.user_handler.get_user_by_username("TestUsername")
+        self.message_list_url = reverse("message-list")
+
+    def tearDown(self):
+        db_query.db_connection.execute_query("DELETE FROM Message WHERE receiver_id = ?", (self.user.id,))
+        super().tearDown()
+
+    @mock.patch.object(StreamingJSONResponse, "chunk_size", 1)
+    @mock.patch.object(type(db_query), "stream_batch_size", 2)
+    def test_list_messages_is_streamed(self):
+        db_query.bulk_create_messages([(self.user.id, self.user.id, f"Message {i}") for i in range(5)])
+        pool = db_query.db_connection
+        checked_out = pool._num_connections - pool._idle.qsize()
+
+        response = self.client.get(self.message_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        # The inbox is fetched a batch at a time, no connection is held while the client reads
+        chunks = []
+        for chunk in response.streaming_content:
+            self.assertEqual(pool._num_connections - pool._idle.qsize(), checked_out)
+            chunks.append(chunk)
+        messages = json.loads(b"".join(chunks))
+        self.assertEqual([message["content"] for message in messages], [f"Message {i}" for i in range(5)])
+        self.assertEqual(list(messages[0]), ["id", "sender_id", "receiver_id", "content"])
+        self.assertTrue(all(message["receiver_id"] == self.user.id for message in messages))
+
+    def test_list_messages_requires_authentication(self):
+        self.client.credentials()
+        response = self.client.get(self.message_list_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
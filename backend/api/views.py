@@ -1,24 +1,35 @@
 #api/views.py
 '''
 CLASSES: 
-LoginView, StandardResultsSetPagination, UserViewSet, ListingViewSet, 
+LoginView, StandardResultsSetPagination, KeysetResultsSetPagination, UserViewSet, ListingViewSet, 
 ServeImageView, 
 '''
+import base64
+import binascii
+import json
 import mimetypes
 import os
+import uuid
 from django.conf import settings
 from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views import View
-from drf_spectacular.utils import OpenApiExample, extend_schema, extend_schema_view
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .handlers import ListingHandler, UserHandler
-from .serializers import ListingSerializer, LoginSerializer, UserSerializer
+from .handlers import ListingHandler, UserHandler, listing_response_cache
+from .serializers import ListingListSerializer, ListingSerializer, LoginSerializer, UserListSerializer, UserSerializer
+from .streaming import StreamingJSONResponse
 
+# Listing versions restart with the process, so ETags issued by a previous process never match
+etag_epoch = uuid.uuid4().hex[:8]
 
 class LoginView(TokenObtainPairView):
     """Handles API requests for logging in.
@@ -53,6 +64,8 @@ class StandardResultsSetPagination(PageNumberPagination):
     """Pagination class that paginates responses into distinct page numbers.
 
     Extends PageNumberPagination- which handles the actual pagination logic.
+    ?pagination=none turns pagination off, the whole list is then streamed by the view (fetched a batch at a
+    time while the response is written).
 
     Attributes:
         page_size (int): The number of objects on each page.
@@ -64,6 +77,11 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 50
 
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get("pagination") == "none":
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data):
         return Response(
             {
@@ -77,6 +95,106 @@ class StandardResultsSetPagination(PageNumberPagination):
         )
 
 
+class KeysetResultsSetPagination(BasePagination):
+    """Pagination class that pages through listings with an opaque cursor instead of page numbers.
+
+    The cursor holds the ordering plus the sort value and id of the last listing on the page, so the next
+    page is fetched by seeking past that row. Deep pages cost the same as the first one, and listings
+    created while scrolling don't shift the pages that come after.
+
+    Attributes:
+        page_size (int): The number of objects on each page.
+        page_size_query_param (String): The query string that is used to choose the page size.
+        max_page_size (int): The maximum number of objects per page.
+        cursor_query_param (String): The query string that holds the cursor.
+    """
+
+    page_size = 12
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    cursor_query_param = "cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request, ordering):
+        """Decodes the cursor from the request.
+
+        Returns:
+            tuple: The (sort value, id) to seek past, or None if this is the first page.
+
+        Raises:
+            NotFound: The cursor is malformed or was made for a different ordering.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if cursor["o"] != (ordering or ""):
+                raise ValueError("Cursor ordering doesn't match request ordering")
+            return (cursor["v"], int(cursor["id"]))
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise NotFound("Invalid cursor.")
+
+    def encode_cursor(self, listing, ordering):
+        sort_field = (ordering or "").lstrip("-")
+        cursor = {
+            "o": ordering or "",
+            "v": getattr(listing, sort_field) if sort_field else None,
+            "id": listing.id,
+        }
+        return base64.urlsafe_b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+
+    def paginate_listings(self, fetch_page, request, ordering=None):
+        """Fetches the page of listings for the request's cursor.
+
+        Args:
+            fetch_page (callable): Takes (after, limit) and returns that many listings after the given position.
+            request (Request): DRF request object.
+            ordering (str, optional): The ordering the listings are sorted by.
+
+        Returns:
+            list: The listings on the current page.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        after = self.decode_cursor(request, ordering)
+
+        # Fetch one extra listing to know whether there is a next page
+        listings = fetch_page(after, page_size + 1)
+        self.has_next = len(listings) > page_size
+        self.page = listings[:page_size]
+
+        self.next_cursor = None
+        if self.has_next:
+            self.next_cursor = self.encode_cursor(self.page[-1], ordering)
+        return self.page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "links": {
+                    "next": self.get_next_link(),
+                },
+                "results": data,
+            }
+        )
+
+
 @extend_schema_view(
     list=extend_schema(
         description="Retrieve a paginated list of all users.",
@@ -195,13 +313,14 @@ class UserViewSet(viewsets.GenericViewSet):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
 
+        # Read-only output, so the fast list serializer is used instead of UserSerializer
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = UserListSerializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        # Fallback if pagination is not applicable
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Fallback if pagination is not applicable -> stream every user instead of building the whole list
+        users = self.user_handler.stream_users()
+        return StreamingJSONResponse(users, serialize=UserListSerializer.to_representation_many)
 
     def create(self, request):
         """Creates a new User.
@@ -255,6 +374,9 @@ class UserViewSet(viewsets.GenericViewSet):
         try:
             response = self.user_handler.partial_update_user(request, pk)
             return response
+        except APIException:
+            # Answered by DRF with the exception's status (ex. PasswordHashingBusy -> 503 with Retry-After)
+            raise
         except Exception as e:
             print(str(e))
             return Response({"error": "Server error occured."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR,)
@@ -494,6 +616,19 @@ class UserViewSet(viewsets.GenericViewSet):
 @extend_schema_view(
     list=extend_schema(
         description="Retrieve a paginated list of listings with optional filters, search, and ordering.",
+        parameters=[
+            OpenApiParameter(
+                "search_mode",
+                str,
+                enum=["fulltext", "fuzzy"],
+                description=(
+                    "fulltext (default) matches words and prefixes in the title, description and tags. "
+                    "fuzzy tolerates typos in the title and tags and orders by similarity unless another ordering "
+                    "is given. Fuzzy recall is capped: only the 200 listings that best match the search's letter trigrams "
+                    "(ranked by BM25) are scored, so with very common terms some similar listings can be missed."
+                ),
+            ),
+        ],
         examples=[
             OpenApiExample(
                 "List Listings Example",
@@ -633,13 +768,14 @@ class ListingViewSet(viewsets.GenericViewSet):
 
     def get_permissions(self):
         # User must be authenticated if performing any action other than retrieve/list
-        self.permission_classes = ([AllowAny] if (self.action in ["list", "retrieve"]) else [IsAuthenticated])
+        self.permission_classes = ([AllowAny] if (self.action in ["list", "retrieve", "facets"]) else [IsAuthenticated])
         return super().get_permissions()
 
-    def get_queryset(self):
+    def get_list_params(self):
         filters = {} # No filters by default
 
         search_term = self.request.query_params.get("search", None)
+        search_mode = self.request.query_params.get("search_mode", None)
         ordering = self.request.query_params.get("ordering", None)
         
         # Add supported filters
@@ -647,16 +783,44 @@ class ListingViewSet(viewsets.GenericViewSet):
             if param in ["min_price", "max_price", "min_likes", "max_dislikes", "condition", "author_id"]:  # Allowed filters
                 filters[param] = value
 
+        # Tag filter -> ?tags=textbooks,math (any of the tags by default, ?tags_match=all for all of them)
+        tags = [
+            tag.strip()
+            for value in self.request.query_params.getlist("tags")
+            for tag in value.split(",")
+            if tag.strip()
+        ]
+        if tags:
+            filters["tags"] = tags
+            filters["tags_match"] = self.request.query_params.get("tags_match", "any")
+
+        # Fuzzy searches are ranked by similarity unless asked otherwise, the cursor has to store that rank too
+        if search_term and search_mode == "fuzzy" and not ordering:
+            ordering = "relevance"
+
+        return filters, search_term, ordering, search_mode
+
+    def get_queryset(self):
+        filters, search_term, ordering, search_mode = self.get_list_params()
+
         # Get the filtered and sorted listings
-        listings = self.listing_handler.list_filtered_listings(filters, search_term, ordering)
+        listings = self.listing_handler.list_filtered_listings(filters, search_term, ordering, search_mode)
 
         # Return listings as Listing instances
         return listings
 
-    # CRUD actions for ListingViewSet
-    def list(self, request):
+    def validate_list_params(self, request):
+        """Validates the filter, search, ordering and pagination params shared by list and facets.
+
+        Args:
+            request (Request): DRF request object.
+
+        Returns:
+            Response: A 400 response if a param is invalid, otherwise None.
+        """
         valid_params = [
             "search",
+            "search_mode",
             "ordering",
             "min_price",
             "max_price",
@@ -664,7 +828,12 @@ class ListingViewSet(viewsets.GenericViewSet):
             "max_dislikes",
             "condition",
             "page",
-            "author_id"
+            "page_size",
+            "pagination",
+            "cursor",
+            "author_id",
+            "tags",
+            "tags_match",
         ]
         valid_ordering_fields = [
             "title",
@@ -674,6 +843,7 @@ class ListingViewSet(viewsets.GenericViewSet):
             "likes",
             "dislikes",
             "created_at",
+            "relevance",  # Only applies when searching
         ]
 
         # Field validation
@@ -682,17 +852,158 @@ class ListingViewSet(viewsets.GenericViewSet):
                 return Response({"error": "Invalid parameter."}, status=status.HTTP_400_BAD_REQUEST)
             if param == "ordering" and value.lstrip("-") not in valid_ordering_fields:
                 return Response({"error": "Invalid ordering parameter."}, status=status.HTTP_400_BAD_REQUEST)
+            if param == "pagination" and value not in ["page", "cursor", "none"]:
+                return Response({"error": "Invalid pagination parameter."}, status=status.HTTP_400_BAD_REQUEST)
+            # fulltext (default) matches words/prefixes, fuzzy tolerates typos in titles and tags
+            if param == "search_mode" and value not in ["fulltext", "fuzzy"]:
+                return Response({"error": "Invalid search_mode parameter."}, status=status.HTTP_400_BAD_REQUEST)
+            if param == "tags_match" and value not in ["any", "all"]:
+                return Response({"error": "Invalid tags_match parameter."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Cursor pages and unpaginated streams seek through the ordering's index, description has none (long text)
+        if request.query_params.get("ordering", "").lstrip("-") == "description":
+            if request.query_params.get("pagination") == "cursor" or "cursor" in request.query_params:
+                return Response({"error": "Invalid ordering parameter for cursor pagination."}, status=status.HTTP_400_BAD_REQUEST)
+            if request.query_params.get("pagination") == "none":
+                return Response({"error": "Invalid ordering parameter for unpaginated lists."}, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+    def conditional_get(self, request, version, modified_at, get_response):
+        """Answers a conditional GET with a 304 if the client already has this version of the data.
+
+        The ETag/Last-Modified come from listing versions kept in memory, so a 304 costs no listing query or
+        serialization. It still costs one single-row read: the version getters call sync_listing_versions() to
+        read the ListingVersion row first. A 304 with no query at all would miss writes made by other processes,
+        and the stale data would then be served as current, so that read is kept on purpose.
+        Only the ETag is compared, Last-Modified has a one second resolution so a write in the same second
+        as the client's copy would still match If-Modified-Since.
 
-        queryset = self.get_queryset()
+        Args:
+            request (Request): DRF request object.
+            version (int): The version of the data the response is built from.
+            modified_at (float): Timestamp of the last change to the data.
+            get_response (callable): Builds the full response if the client's copy is stale.
+
+        Returns:
+            Response: A 304 response, or the full response with ETag and Last-Modified headers.
+        """
+        etag = f'W/"{etag_epoch}-{version}"'
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = get_response()
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(modified_at)
+        return response
+
+    # CRUD actions for ListingViewSet
+    def list(self, request):
+        error_response = self.validate_list_params(request)
+        if error_response:
+            return error_response
+
+        # Read the version before querying, so a concurrent write can only make the ETag older than the data
+        version, modified_at = self.listing_handler.get_listings_version()
+        return self.conditional_get(request, version, modified_at, lambda: self.get_cached_list_response(request))
+
+    def get_cached_list_response(self, request):
+        # Cached pages are stored as JSON, so other formats (ex. the browsable API) skip the cache
+        if listing_response_cache is None or request.accepted_renderer.format != "json":
+            return self.get_list_response(request)
+
+        # Pages hold absolute links built from the Host header, so a forged host can't leak into other clients' pages
+        key = listing_response_cache.make_key(request.query_params, f"{request.scheme}://{request.get_host()}")
+        response = listing_response_cache.get(key, request)
+        if response is None:
+            generation = listing_response_cache.generation
+            response = self.get_list_response(request)
+            # Streamed (unpaginated) lists aren't cached, they are never held in memory
+            if response.status_code == status.HTTP_200_OK and not response.streaming:
+                listing_response_cache.set(key, response.data, request.query_params, generation)
+        return response
+
+    def get_list_response(self, request):
+        # Opt-in keyset pagination (ex. for infinite scrolling) -> ?pagination=cursor
+        if request.query_params.get("pagination") == "cursor" or "cursor" in request.query_params:
+            return self.list_with_cursor(request)
+
+        # Serialize the query rows directly, skipping Listing instances and ListingSerializer's per-field calls
+        queryset = self.listing_handler.list_filtered_listings(*self.get_list_params(), as_rows=True)
         page = self.paginate_queryset(queryset)
 
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = ListingListSerializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        # Fallback if pagination is not applicable
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Fallback if pagination is not applicable -> stream every listing instead of building the whole list
+        listings = self.listing_handler.stream_filtered_listings(*self.get_list_params())
+        return StreamingJSONResponse(listings, serialize=ListingListSerializer.to_representation_many)
+
+    def list_with_cursor(self, request):
+        """Lists listings one page at a time using an opaque cursor (keyset pagination).
+
+        Args:
+            request (Request): DRF request object.
+
+        Returns:
+            Response: An object containing the page of listings and a link to the next page.
+        """
+
+        filters, search_term, ordering, search_mode = self.get_list_params()
+
+        def fetch_page(after, limit):
+            return self.listing_handler.list_listings_after(filters, search_term, ordering, after, limit, search_mode)
+
+        paginator = KeysetResultsSetPagination()
+        page = paginator.paginate_listings(fetch_page, request, ordering)
+        serializer = ListingListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        description="Counts the listings matching the same filters and search as the listing list, per condition, price bucket and tag.",
+        examples=[
+            OpenApiExample(
+                "Listing Facets Example",
+                value={
+                    "count": 3,
+                    "conditions": {"Well Worn": 2, "Factory New": 1},
+                    "price_buckets": [
+                        {"min": 0, "max": 25, "count": 1},
+                        {"min": 25, "max": 50, "count": 2},
+                        {"min": 1000, "max": None, "count": 0},
+                    ],
+                    "tags": [{"name": "textbook", "count": 2}],
+                },
+                response_only=True,
+            )
+        ],
+    )
+    @action(detail=False)
+    def facets(self, request):
+        """Counts the listings matching the list filters/search for the filter sidebar.
+
+        -The url for this method will be listings/facets/
+
+        Args:
+            request (Request): DRF request object.
+
+        Returns:
+            Response: A DRF Response object with the facet counts.
+        """
+        error_response = self.validate_list_params(request)
+        if error_response:
+            return error_response
+
+        try:
+            filters, search_term, _, search_mode = self.get_list_params()
+            facets = self.listing_handler.get_listing_facets(filters, search_term, search_mode)
+            return Response(facets, status=status.HTTP_200_OK)
+        except Exception as e:
+            print(f"Error in facets: {e}")
+            return Response({"error": "Server error occured."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -705,6 +1016,13 @@ class ListingViewSet(viewsets.GenericViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def retrieve(self, request, pk=None):
+        try:
+            version, modified_at = self.listing_handler.get_listing_version(pk)
+        except ValueError:
+            return self.get_retrieve_response(pk)
+        return self.conditional_get(request, version, modified_at, lambda: self.get_retrieve_response(pk))
+
+    def get_retrieve_response(self, pk):
         listing = self.listing_handler.get_listing(pk)
         if listing:
             serializer = self.get_serializer(listing)
@@ -847,12 +1165,9 @@ class ListingViewSet(viewsets.GenericViewSet):
     )
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def like_listing(self, request, pk=None):
-        listing = self.listing_handler.get_listing(pk)
-        if listing:
-            # Use dot notation to access 'likes' if 'listing' is an object
-            response = self.listing_handler.like_listing(pk, listing.likes)
-            return response
-        return Response({"error": "Listing with that id not found."}, status=status.HTTP_404_NOT_FOUND)
+        # The handler increments atomically and returns 404 if the listing doesn't exist
+        response = self.listing_handler.like_listing(pk)
+        return response
 
     @extend_schema(
         description="Increments the dislike count for a specific listing.",
@@ -865,11 +1180,9 @@ class ListingViewSet(viewsets.GenericViewSet):
     )
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def dislike_listing(self, request, pk=None):
-        listing = self.listing_handler.get_listing(pk)
-        if listing:
-            response = self.listing_handler.dislike_listing(pk, listing.dislikes)
-            return response
-        return Response({"error": "Listing with that id not found."}, status=status.HTTP_404_NOT_FOUND)
+        # The handler increments atomically and returns 404 if the listing doesn't exist
+        response = self.listing_handler.dislike_listing(pk)
+        return response
 
 
 class ServeImageView(View):
@@ -52,6 +52,43 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# In-process cache of authenticated users (api.authentication), TTL is in seconds
+AUTH_USER_CACHE = {
+    "MAX_SIZE": 1024,
+    "TTL": 60,
+}
+
+# In-process cache of verified access tokens (api.authentication), entries expire with the token
+AUTH_TOKEN_CACHE = {
+    "MAX_SIZE": 4096,
+}
+
+# Opt-in stateless authentication: users are built from the access token's claims instead of the
+# User table, the user's version is re-checked at most every VERSION_CHECK_INTERVAL seconds
+AUTH_CLAIMS_ONLY = {
+    "ENABLED": False,
+    "VERSION_CHECK_INTERVAL": 30,
+}
+
+# Rendered + gzipped listing feed pages (api.response_cache), invalidated by the listing writes that
+# change them. BACKEND is any class with get/set/delete/clear, created with OPTIONS.
+# Entries are kept per process, writes by other worker processes are detected through the shared
+# ListingVersion row (read once per request) and drop every entry
+LISTING_RESPONSE_CACHE = {
+    "ENABLED": True,
+    "BACKEND": "db_utils.caches.LRUCache",
+    "OPTIONS": {"max_size": 512},
+    "MAX_ENTRIES": 512,
+}
+
+# Password hashing runs on a bounded process pool (api.password_hashing), once MAX_PENDING
+# hashes are running/queued new logins and registrations get a 503 (WORKERS = 0 hashes inline)
+PASSWORD_HASHING_POOL = {
+    "WORKERS": 2,
+    "MAX_PENDING": 8,
+    "TIMEOUT": 30,
+}
+
 
 # Application definition
 INSTALLED_APPS = [
@@ -70,6 +107,7 @@ INSTALLED_APPS = [
     "drf_spectacular"
 ]
 
+# Add "db_utils.middleware.RequestTransactionMiddleware" to run each request on one db connection and transaction
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
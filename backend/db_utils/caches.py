@@ -0,0 +1,79 @@
+'''
+CLASSES:
+LRUCache
+'''
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-process cache that evicts the least recently used entry once it is full.
+
+    Entries can also expire after a time to live. The cache is local to the process, so values
+    cached from the database are only invalidated by writes made through this process.
+
+    Attributes:
+        max_size (int): Max number of entries kept.
+        ttl (float): Seconds an entry stays valid, or None to keep entries until they are evicted.
+        hits (int): Number of lookups that found a valid entry.
+        misses (int): Number of lookups that didn't.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Gets the cached value for a key.
+
+        Args:
+            key (hashable): The key to look up.
+            default (any, optional): Returned if the key isn't cached or has expired. Defaults to None.
+
+        Returns:
+            any: The cached value or default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                # Expired
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Caches a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (hashable): The key to cache the value under.
+            value (any): The value to cache.
+            ttl (float, optional): Seconds this entry stays valid. Defaults to the cache's ttl.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
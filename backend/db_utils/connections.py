@@ -1,8 +1,11 @@
+import queue
 import sqlite3
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 '''
 CLASSES: 
-DBConnection, SQLiteConnection
+DBConnection, QueryStream, SQLiteConnection, SQLiteConnectionPool
 '''
 
 class DBConnection(ABC):
@@ -22,6 +25,26 @@ class DBConnection(ABC):
     def execute_query(self, query, params=None):
         pass
 
+    @abstractmethod
+    def execute_many(self, query, params_list):
+        pass
+
+    @abstractmethod
+    def stream_query(self, query, params=None, batch_size=500, convert=None):
+        pass
+
+    @abstractmethod
+    def transaction(self, immediate=False):
+        pass
+
+    @abstractmethod
+    def set_rollback(self):
+        pass
+
+    @abstractmethod
+    def on_commit(self, callback):
+        pass
+
     @abstractmethod
     def __enter__(self):
         pass
@@ -31,11 +54,103 @@ class DBConnection(ABC):
         pass
 
 
+class QueryStream:
+    """Iterator over a SELECT's rows that fetches them from the cursor in batches.
+
+    Only one batch is held in memory at a time, so any number of rows can be processed in
+    constant memory. The stream keeps its connection until it is exhausted or closed (it
+    can also be used as a context manager), which can happen on any thread (ex. a streamed
+    response closed by the server, or garbage collected).
+
+    Attributes:
+        cursor (sqlite3.Cursor): The cursor the query ran on.
+        batch_size (int): Number of rows fetched at a time.
+        convert (callable): Applied to each row before it is returned, or None to return the raw rows.
+    """
+
+    def __init__(self, cursor, batch_size=500, convert=None, on_close=None):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.convert = convert
+        self._on_close = on_close
+        self._batch = iter(())
+        self.closed = False
+
+    @property
+    def columns(self):
+        # The result's column names, in order
+        return tuple(column[0] for column in self.cursor.description)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self.closed:
+            for row in self._batch:
+                return self.convert(row) if self.convert else row
+
+            rows = self.cursor.fetchmany(self.batch_size)
+            if not rows:
+                self.close()
+                break
+            self._batch = iter(rows)
+        raise StopIteration
+
+    def close(self):
+        """Stops the query and releases the connection, safe to call more than once."""
+
+        if self.closed:
+            return
+        self.closed = True
+        self._batch = iter(())
+        try:
+            self.cursor.close()
+        finally:
+            if self._on_close:
+                self._on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # Abandoned streams still give their connection back
+        if not getattr(self, "closed", True):
+            self.close()
+
+
 class SQLiteConnection(DBConnection):
+    def _open_connection(self):
+        """Opens a new physical connection to the SQLite database.
+
+        Returns:
+            sqlite3.Connection: The newly opened connection.
+        """
+        # check_same_thread is disabled so the connection can be handed between threads by a pool,
+        # the pool guarantees only one thread uses a connection at a time
+        connection = sqlite3.connect(self.db_config["NAME"], check_same_thread=False)
+        connection.row_factory = sqlite3.Row  # Enables accessing columns by name
+        self._apply_pragmas(connection)
+        return connection
+
+    def _apply_pragmas(self, connection):
+        """Applies the PRAGMA profile from the db config to a newly opened connection.
+
+        Args:
+            connection (sqlite3.Connection): The connection to configure.
+        """
+        for name, value in self.db_config.get("PRAGMAS", {}).items():
+            # PRAGMA statements can't use parameters, so only allow plain names/values
+            if not name.isidentifier() or not str(value).lstrip("-").isalnum():
+                raise ValueError(f"Invalid SQLite pragma: {name} = {value}")
+            connection.execute(f"PRAGMA {name} = {value}")
+
     def connect(self):
         try:
             if not self.connection:
-                self.connection = sqlite3.connect(self.db_config["NAME"])
+                self.connection = self._open_connection()
         except sqlite3.Error as e:
             print(f"Error connecting to SQLite: {e}")
             raise
@@ -47,8 +162,8 @@ class SQLiteConnection(DBConnection):
 
     def execute_query(self, query, params=None):
         try:
-            self.connect()
-            self.connection.row_factory = sqlite3.Row  # Enables accessing columns by name
+            if not self.connection:
+                self.connect()
             
             cursor = self.connection.cursor()
             if params:
@@ -56,20 +171,309 @@ class SQLiteConnection(DBConnection):
             else:
                 cursor.execute(query)
 
-            if query.strip().upper().startswith("SELECT"):
-                return cursor.fetchall()
-            else:
-                object_id = cursor.lastrowid
-                # For INSERT, UPDATE, DELETE queries
+            # Queries that return rows (SELECT, WITH, a write's RETURNING clause) return them,
+            # other INSERT, UPDATE, DELETE queries return the last inserted row's id
+            result = cursor.fetchall() if cursor.description is not None else cursor.lastrowid
+
+            # Writes are committed right away, inside a transaction() scope the scope commits instead
+            if self.connection.in_transaction and not self._get_scopes():
                 self.connection.commit()
-                return object_id
+            return result
         except sqlite3.Error as e:
             print(f"An error occurred during query execution: {e}")
             raise
 
+    def execute_many(self, query, params_list):
+        """Runs a write statement once for every set of parameters, as a batch with a single commit.
+
+        Inside a transaction() scope the scope commits instead.
+
+        Args:
+            query (str): The INSERT, UPDATE or DELETE statement.
+            params_list (iterable): A parameter tuple per execution.
+
+        Returns:
+            int: The number of rows changed.
+        """
+        try:
+            if not self.connection:
+                self.connect()
+
+            cursor = self.connection.executemany(query, params_list)
+            if not self._get_scopes():
+                self.connection.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"An error occurred during query execution: {e}")
+            raise
+
+    def stream_query(self, query, params=None, batch_size=500, convert=None, on_close=None):
+        """Runs a SELECT and returns its rows as a stream instead of fetching them all at once.
+
+        The query runs immediately (so errors are raised here), the rows are fetched as the stream is iterated.
+
+        Args:
+            query (str): The SELECT query.
+            params (list, optional): The query parameters.
+            batch_size (int, optional): Number of rows fetched at a time. Defaults to 500.
+            convert (callable, optional): Applied to each row before it is returned.
+            on_close (callable, optional): Called once the stream is exhausted or closed.
+
+        Returns:
+            QueryStream: An iterator over the rows.
+        """
+        if not self.connection:
+            self.connect()
+        return self._open_stream(self.connection, query, params, batch_size, convert, on_close)
+
+    def _open_stream(self, connection, query, params, batch_size, convert, on_close):
+        # Runs the query on the given connection, on_close is still called if it fails
+        try:
+            cursor = connection.execute(query, params or ())
+        except sqlite3.Error as e:
+            print(f"An error occurred during query execution: {e}")
+            if on_close:
+                on_close()
+            raise
+        return QueryStream(cursor, batch_size, convert, on_close)
+
+    def _get_scopes(self):
+        # The open transaction() scopes on this connection, innermost last
+        if not hasattr(self, "_scopes"):
+            self._scopes = []
+        return self._scopes
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Groups queries into one transaction, committed when the outermost scope exits.
+
+        Inside a scope execute_query doesn't commit each write. Nested scopes are savepoints, an
+        exception leaving a scope (or set_rollback()) undoes only that scope's writes. The outermost
+        scope commits (or rolls back) everything at once, then runs the on_commit() callbacks.
+
+        Args:
+            immediate (bool, optional): Take the write lock when the outermost scope opens (BEGIN IMMEDIATE).
+                By default SQLite starts the transaction at the first write, so reads before it
+                don't hold the transaction open.
+
+        Yields:
+            SQLiteConnection: This connection.
+        """
+        if not self.connection:
+            self.connect()
+
+        scopes = self._get_scopes()
+        savepoint = f"scope_{len(scopes)}" if scopes else None
+        if savepoint:
+            # Releasing a savepoint that started the transaction would commit it, so start it first
+            if not self.connection.in_transaction:
+                self.connection.execute("BEGIN")
+            self.connection.execute(f"SAVEPOINT {savepoint}")
+        elif immediate:
+            self.connection.execute("BEGIN IMMEDIATE")
+
+        scope = {"rollback": False, "on_commit": []}
+        scopes.append(scope)
+        try:
+            yield self
+        except BaseException:
+            scope["rollback"] = True
+            raise
+        finally:
+            scopes.pop()
+            if savepoint:
+                if scope["rollback"]:
+                    self.connection.execute(f"ROLLBACK TO {savepoint}")
+                self.connection.execute(f"RELEASE {savepoint}")
+                if not scope["rollback"]:
+                    # Runs once the outer scopes commit too
+                    scopes[-1]["on_commit"].extend(scope["on_commit"])
+            elif scope["rollback"]:
+                self.connection.rollback()
+            else:
+                try:
+                    self.connection.commit()
+                except sqlite3.Error:
+                    self.connection.rollback()
+                    raise
+                for callback in scope["on_commit"]:
+                    callback()
+
+    def set_rollback(self):
+        """Rolls back the innermost transaction() scope when it exits, instead of committing it."""
+
+        scopes = self._get_scopes()
+        if not scopes:
+            raise RuntimeError("set_rollback() called outside of a transaction scope.")
+        scopes[-1]["rollback"] = True
+
+    def on_commit(self, callback):
+        """Runs a callback once the current transaction commits, or right away if no transaction() scope is open.
+
+        Used for work that must only see committed data (ex. invalidating caches). Callbacks from
+        scopes that are rolled back are dropped.
+
+        Args:
+            callback (callable): Takes no arguments.
+        """
+        scopes = self._get_scopes()
+        if scopes:
+            scopes[-1]["on_commit"].append(callback)
+        else:
+            callback()
+
     def __enter__(self):
         self.connect()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.disconnect()
+
+
+class SQLiteConnectionPool(SQLiteConnection):
+    """Thread-safe SQLite connection manager that reuses a bounded set of physical connections.
+
+    A single instance is shared by every request thread. Entering the object (or calling connect())
+    checks a connection out of the pool for the calling thread, and leaving it returns the connection
+    instead of closing it. Nested 'with' blocks on the same thread reuse the connection that is already checked out.
+
+    Streams (stream_query()) can outlive the block or thread that opened them, so they hold on to the exact
+    connection they run on instead of the thread's checkout. A connection is only returned to the pool once
+    every holder (the thread and any open streams) is done with it.
+
+    Attributes:
+        max_size (int): The maximum number of physical connections the pool will open.
+        timeout (float): How many seconds a thread waits for a free connection before giving up.
+    """
+
+    def __init__(self, db_config):
+        # Each thread keeps track of its own checked out connection
+        self._local = threading.local()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._num_connections = 0
+        # Checked out connection -> number of holders (the thread it's bound to + open streams)
+        self._holders = {}
+
+        self.max_size = db_config.get("POOL_SIZE", 5)
+        self.timeout = db_config.get("POOL_TIMEOUT", 30)
+        super().__init__(db_config)
+
+    @property
+    def connection(self):
+        return getattr(self._local, "connection", None)
+
+    @connection.setter
+    def connection(self, value):
+        self._local.connection = value
+
+    def _checkout(self):
+        # Prefer an idle connection
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        # Open a new connection if the pool isn't full yet
+        with self._lock:
+            can_open = self._num_connections < self.max_size
+            if can_open:
+                self._num_connections += 1
+
+        if can_open:
+            try:
+                return self._open_connection()
+            except sqlite3.Error:
+                with self._lock:
+                    self._num_connections -= 1
+                raise
+
+        # Otherwise wait for another thread to return one
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a pooled SQLite connection.")
+
+    def _checkin(self, connection):
+        # Never hand out a connection with another request's uncommitted work on it
+        if connection.in_transaction:
+            connection.rollback()
+        self._idle.put(connection)
+
+    def _hold(self, connection):
+        with self._lock:
+            self._holders[connection] = self._holders.get(connection, 0) + 1
+
+    def _release(self, connection):
+        # The last holder gives the connection back, whichever thread it's on
+        with self._lock:
+            self._holders[connection] -= 1
+            done = self._holders[connection] <= 0
+            if done:
+                del self._holders[connection]
+        if done:
+            self._checkin(connection)
+
+    def connect(self):
+        try:
+            if not self.connection:
+                connection = self._checkout()
+                self._hold(connection)
+                self.connection = connection
+                self._local.depth = 0
+            self._local.depth += 1
+        except sqlite3.Error as e:
+            print(f"Error connecting to SQLite: {e}")
+            raise
+
+    def disconnect(self):
+        if not self.connection:
+            return
+
+        self._local.depth -= 1
+        if self._local.depth <= 0:
+            connection = self.connection
+            self.connection = None
+            self._release(connection)
+
+    def execute_query(self, query, params=None):
+        # Hold a connection for the duration of the query, even if the caller didn't check one out
+        with self:
+            return super().execute_query(query, params)
+
+    def execute_many(self, query, params_list):
+        with self:
+            return super().execute_many(query, params_list)
+
+    def stream_query(self, query, params=None, batch_size=500, convert=None):
+        # Inside a 'with' block the stream shares the thread's connection (ex. to read its own transaction's writes),
+        # otherwise it checks out one of its own without binding it to this thread.
+        # Either way closing the stream releases that exact connection, so it can be closed from any thread.
+        connection = self.connection or self._checkout()
+        self._hold(connection)
+        return self._open_stream(connection, query, params, batch_size, convert, on_close=lambda: self._release(connection))
+
+    def _get_scopes(self):
+        # Scopes belong to the connection this thread has checked out
+        if not hasattr(self._local, "scopes"):
+            self._local.scopes = []
+        return self._local.scopes
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        # Hold the connection until the outermost scope commits
+        with self:
+            with super().transaction(immediate) as db:
+                yield db
+
+    def close_all(self):
+        """Closes every idle connection in the pool."""
+
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self._lock:
+                self._num_connections -= 1
@@ -2,17 +2,44 @@
 CLASSES: 
 DBType, DBFactory
 '''
+import threading
 from enum import Enum
-from db_utils.connections import SQLiteConnection
+from db_utils.connections import SQLiteConnection, SQLiteConnectionPool
 
 
 class DBType(Enum):
     SQLITE = "sqlite"
     MYSQL = "mysql"
     POSTGRES = "postgres"
+
+# SQLite PRAGMA settings that are applied once to each new physical connection (in order)
+sqlite_pragma_profiles = {
+    # SQLite's built in defaults (rollback journal, full sync)
+    "default": {},
+    # WAL lets readers keep going while a write is in progress
+    "production": {
+        "busy_timeout": 5000,  # Wait up to 5s for a lock instead of failing right away
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # Safe with WAL, only the last commits can be lost on power failure
+        "cache_size": -64000,  # Negative values are in KiB, so ~64MB of page cache per connection
+        "mmap_size": 268435456,  # Memory map up to 256MB of the database file
+        "temp_store": "MEMORY",
+    },
+}
+
 db_configs = {
     DBType.SQLITE: {
         "NAME": "db.sqlite3",
+        "PRAGMAS": sqlite_pragma_profiles["production"],
+        # Max number of connections kept open/shared between request threads
+        "POOL_SIZE": 10,
+        # Seconds to wait for a free connection when all of them are in use
+        "POOL_TIMEOUT": 30,
+        # Apply pending db_utils/migrations when one of these manage.py commands starts (local development/tests).
+        # Deployments run "python manage.py migrate_db" before starting, so server processes never migrate on startup
+        "AUTO_MIGRATE_COMMANDS": ["runserver", "test"],
+        # Buffer like/dislike increments and write them every N ms (0 writes each one right away)
+        "COUNTER_FLUSH_INTERVAL_MS": 0,
     },
     DBType.POSTGRES: {
         "NAME": "my_postgres_db",
@@ -25,11 +52,18 @@ db_configs = {
 
 
 class DBFactory:
+    # One shared connection manager per database type
+    _connections = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def get_db_connection(db_type):
-        if db_type == DBType.SQLITE:
-            return SQLiteConnection(db_configs[DBType.SQLITE])
-        elif db_type == DBType.POSTGRES:
-            return SQLiteConnection(db_configs[DBType.POSTGRES])
-        else:
-            raise ValueError("Unsupported database type")
\ No newline at end of file
+        with DBFactory._lock:
+            if db_type not in DBFactory._connections:
+                if db_type == DBType.SQLITE:
+                    DBFactory._connections[db_type] = SQLiteConnectionPool(db_configs[DBType.SQLITE])
+                elif db_type == DBType.POSTGRES:
+                    DBFactory._connections[db_type] = SQLiteConnection(db_configs[DBType.POSTGRES])
+                else:
+                    raise ValueError("Unsupported database type")
+            return DBFactory._connections[db_type]
@@ -0,0 +1,34 @@
+'''
+CLASSES:
+RequestTransactionMiddleware
+'''
+from db_utils.db_factory import DBFactory, DBType
+
+
+class RequestTransactionMiddleware:
+    """Runs each request on one database connection, inside one transaction scope.
+
+    Every query of the request reuses the connection checked out here instead of checking one
+    out per query block, and the request's writes are committed together when the response is
+    ready. A request then pays for a single commit (fsync), and other requests never see its
+    writes half done. The transaction is rolled back if the view raises or returns a 5xx response.
+
+    SQLite only starts the transaction at the request's first write, so read-only requests (and
+    the reads before a request's first write) don't hold it open. A writing request does keep the
+    write lock until it finishes, which makes other writers wait (up to the busy_timeout pragma).
+
+    Streamed responses (StreamingJSONResponse) hold their own connection while they are written.
+
+    Optional, enable it by adding "db_utils.middleware.RequestTransactionMiddleware" to MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.db_connection = DBFactory.get_db_connection(DBType.SQLITE)
+
+    def __call__(self, request):
+        with self.db_connection.transaction() as db:
+            response = self.get_response(request)
+            if response.status_code >= 500:
+                db.set_rollback()
+        return response
@@ -64,11 +64,3 @@ CREATE TABLE IF NOT EXISTS Message (
     FOREIGN KEY (sender_id) REFERENCES User(id) ON DELETE CASCADE,
     FOREIGN KEY (receiver_id) REFERENCES User(id) ON DELETE CASCADE
 );
-
-DROP TABLE User;
-DROP TABLE Listing;
-DROP TABLE Tag;
-DROP TABLE ListingTag;
-DROP TABLE UserFavoriteListing;
-DROP TABLE UserBlock;
-DROP TABLE Message;
@@ -0,0 +1,14 @@
+-- Listing feed filters/orderings
+-- (Every index implicitly ends with the rowid (id), so these also serve (sort_key, id) keyset seeks)
+CREATE INDEX IF NOT EXISTS idx_listing_author_id ON Listing (author_id);
+CREATE INDEX IF NOT EXISTS idx_listing_created_at ON Listing (created_at);
+CREATE INDEX IF NOT EXISTS idx_listing_price ON Listing (price);
+
+-- Inbox (get_all_messages)
+CREATE INDEX IF NOT EXISTS idx_message_receiver_id ON Message (receiver_id);
+
+-- Favorites (retrieve_favorite_listings), the primary key starts with listing_id
+CREATE INDEX IF NOT EXISTS idx_userfavoritelisting_user_id ON UserFavoriteListing (user_id);
+
+-- Blocks by blocked user, the primary key starts with blocker_id
+CREATE INDEX IF NOT EXISTS idx_userblock_blocked_id ON UserBlock (blocked_id);
@@ -0,0 +1,17 @@
+-- Full text index over listing titles, descriptions and tag names (rowid = Listing.id)
+-- Kept in sync by SQLiteDBQuery.create_listing/partial_update_listing/delete_listing
+CREATE VIRTUAL TABLE IF NOT EXISTS ListingSearch USING fts5(
+    title,
+    description,
+    tags,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Index the existing listings
+DELETE FROM ListingSearch;
+INSERT INTO ListingSearch (rowid, title, description, tags)
+SELECT l.id, l.title, l.description, COALESCE(GROUP_CONCAT(t.name, ' '), '')
+FROM Listing l
+LEFT JOIN ListingTag lt ON l.id = lt.listing_id
+LEFT JOIN Tag t ON lt.tag_id = t.id
+GROUP BY l.id;
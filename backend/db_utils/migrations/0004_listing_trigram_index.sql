@@ -0,0 +1,16 @@
+-- Trigram index over listing titles and tag names for typo tolerant (fuzzy) search (rowid = Listing.id)
+-- Kept in sync together with ListingSearch by SQLiteDBQuery._refresh_search_index
+CREATE VIRTUAL TABLE IF NOT EXISTS ListingTrigram USING fts5(
+    title,
+    tags,
+    tokenize = 'trigram'
+);
+
+-- Index the existing listings
+DELETE FROM ListingTrigram;
+INSERT INTO ListingTrigram (rowid, title, tags)
+SELECT l.id, l.title, COALESCE(GROUP_CONCAT(t.name, ' '), '')
+FROM Listing l
+LEFT JOIN ListingTag lt ON l.id = lt.listing_id
+LEFT JOIN Tag t ON lt.tag_id = t.id
+GROUP BY l.id;
@@ -0,0 +1,13 @@
+-- Store each listing's tag names on the row itself (JSON array) so listing reads don't need to
+-- join ListingTag/Tag and GROUP BY. ListingTag/Tag are kept for tag filtering.
+-- Kept in sync by SQLiteDBQuery.create_listing/partial_update_listing
+ALTER TABLE Listing ADD COLUMN tags TEXT NOT NULL DEFAULT '[]';
+
+-- Backfill the existing listings
+UPDATE Listing
+SET tags = (
+    SELECT json_group_array(t.name)
+    FROM ListingTag lt
+    INNER JOIN Tag t ON lt.tag_id = t.id
+    WHERE lt.listing_id = Listing.id
+);
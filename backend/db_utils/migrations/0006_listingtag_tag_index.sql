@@ -0,0 +1,3 @@
+-- Tag filtering (tags=...): the primary key starts with listing_id, so this is the
+-- inverted index from a tag to its listings (its posting list)
+CREATE INDEX IF NOT EXISTS idx_listingtag_tag_id ON ListingTag (tag_id, listing_id);
@@ -0,0 +1,3 @@
+-- Incremented on every user update, access tokens carry the version they were issued for
+-- so claims-only authentication can reject tokens of updated or deleted users
+ALTER TABLE User ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
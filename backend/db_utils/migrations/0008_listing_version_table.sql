@@ -0,0 +1,9 @@
+-- Version shared by every worker process, moved forward in the same transaction as each listing write.
+-- Listing caches and ETags are kept per process, a process that sees a version it didn't write itself
+-- knows another process changed the listings (see SQLiteDBQuery.sync_listing_versions)
+CREATE TABLE IF NOT EXISTS ListingVersion (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO ListingVersion (id, version) VALUES (1, 0);
@@ -0,0 +1,7 @@
+-- The rest of the listing feed orderings, so cursor (keyset) pages seek through an index at any depth
+-- instead of scanning and sorting the whole table (see 0002 for created_at/price).
+-- description is not indexed (long text), cursor pagination doesn't accept that ordering
+CREATE INDEX IF NOT EXISTS idx_listing_title ON Listing (title);
+CREATE INDEX IF NOT EXISTS idx_listing_condition ON Listing (condition);
+CREATE INDEX IF NOT EXISTS idx_listing_likes ON Listing (likes);
+CREATE INDEX IF NOT EXISTS idx_listing_dislikes ON Listing (dislikes);
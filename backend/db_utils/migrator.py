@@ -0,0 +1,125 @@
+'''
+CLASSES: 
+MigrationRunner
+'''
+import os
+import re
+import sqlite3
+
+# Migration files are named <version>_<name>.sql, ex. 0002_secondary_indexes.sql
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+class MigrationRunner:
+    """Applies the versioned .sql files in db_utils/migrations/ that haven't been applied yet.
+
+    Applied versions are recorded in the SchemaMigration table. Each migration runs in its own
+    'BEGIN IMMEDIATE' transaction and the version is re-checked once the write lock is held,
+    so several processes starting against the same live database won't apply a migration twice.
+
+    Attributes:
+        db_connection (DBConnection): Database connection object used to run the migrations.
+        migrations_dir (str): The directory containing the migration files.
+    """
+
+    def __init__(self, db_connection, migrations_dir=MIGRATIONS_DIR):
+        self.db_connection = db_connection
+        self.migrations_dir = migrations_dir
+
+    def get_migrations(self):
+        """Finds all migration files.
+
+        Returns:
+            list: (version, name, path) tuples sorted by version.
+        """
+        migrations = []
+        for file_name in os.listdir(self.migrations_dir):
+            match = MIGRATION_FILE_PATTERN.match(file_name)
+            if match:
+                version, name = int(match.group(1)), match.group(2)
+                migrations.append((version, name, os.path.join(self.migrations_dir, file_name)))
+        return sorted(migrations)
+
+    def get_applied_versions(self):
+        with self.db_connection as db:
+            self._create_migration_table(db.connection)
+            rows = db.connection.execute("SELECT version FROM SchemaMigration").fetchall()
+        return {row[0] for row in rows}
+
+    def apply_pending(self):
+        """Applies every migration that hasn't been applied yet, in version order.
+
+        Returns:
+            list: The (version, name) of each migration that was applied.
+        """
+        applied = []
+        applied_versions = self.get_applied_versions()
+
+        for version, name, path in self.get_migrations():
+            if version in applied_versions:
+                continue
+            with open(path, encoding="utf-8") as migration_file:
+                statements = split_sql_statements(migration_file.read())
+
+            with self.db_connection as db:
+                if self._apply(db.connection, version, name, statements):
+                    applied.append((version, name))
+        return applied
+
+    def _create_migration_table(self, connection):
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS SchemaMigration (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        connection.commit()
+
+    def _apply(self, connection, version, name, statements):
+        try:
+            # Take the write lock up front so the version check below can't race another process
+            connection.execute("BEGIN IMMEDIATE")
+            already_applied = connection.execute(
+                "SELECT 1 FROM SchemaMigration WHERE version = ?", (version,)
+            ).fetchone()
+            if already_applied:
+                connection.rollback()
+                return False
+
+            for statement in statements:
+                connection.execute(statement)
+            connection.execute(
+                "INSERT INTO SchemaMigration (version, name) VALUES (?, ?)", (version, name)
+            )
+            connection.commit()
+            return True
+        except sqlite3.Error as e:
+            connection.rollback()
+            print(f"Error applying migration {version}_{name}: {e}")
+            raise
+
+
+def split_sql_statements(sql):
+    """Splits a SQL script into individual statements (triggers with inner ';' are kept whole).
+
+    Args:
+        sql (str): The SQL script.
+
+    Returns:
+        list: The statements in the script.
+    """
+    statements = []
+    current = ""
+    for line in sql.splitlines(keepends=True):
+        # Skip comment-only lines
+        if not current and (not line.strip() or line.strip().startswith("--")):
+            continue
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    if current.strip():
+        statements.append(current.strip())
+    return statements
@@ -3,8 +3,15 @@
 CLASSES: 
 DBQuery, SQLiteDBQuery
 '''
+import itertools
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 from django.conf import settings
+from db_utils.row_mappers import RowMapper
 
 class DBQuery(ABC):
     """Abstract Singleton class that is used to outline all the necessary query methods.
@@ -32,10 +39,30 @@ class DBQuery(ABC):
     def get_all_listings(self):
         pass
 
+    @abstractmethod
+    def get_filtered_listings(self, filters=None, search_term=None, ordering=None, limit=None, offset=None, after=None, search_mode=None, stream=False, model=None, fuzzy_matches=None):
+        pass
+
+    @abstractmethod
+    def count_filtered_listings(self, filters=None, search_term=None, search_mode=None, fuzzy_matches=None):
+        pass
+
+    @abstractmethod
+    def get_fuzzy_matches(self, search_term):
+        pass
+
+    @abstractmethod
+    def get_listing_facets(self, filters=None, search_term=None, search_mode=None):
+        pass
+
     @abstractmethod
     def create_listing(self, data, user_id):
         pass
 
+    @abstractmethod
+    def bulk_create_listings(self, listings, user_id):
+        pass
+
     @abstractmethod
     def get_listing_by_id(self, listing_id):
         pass
@@ -61,25 +88,41 @@ class DBQuery(ABC):
     def add_favorite_listing(self, user_id, listing_id):
         pass
 
+    @abstractmethod
+    def bulk_add_favorite_listings(self, favorites):
+        pass
+
     @abstractmethod
     def remove_favorite_listing(self, user_id, listing_id):
         pass
     
     @abstractmethod
-    def retrieve_favorite_listings(self, user_id):
+    def retrieve_favorite_listings(self, user_id, stream=False):
         pass
 
     @abstractmethod
-    def like_listing(self, listing_id, current_likes):
+    def listing_exists(self, listing_id):
         pass
 
     @abstractmethod
-    def dislike_listing(self, listing_id, current_dislikes):
+    def like_listing(self, listing_id, amount=1):
+        pass
+
+    @abstractmethod
+    def dislike_listing(self, listing_id, amount=1):
+        pass
+
+    @abstractmethod
+    def increment_listing_counters(self, increments):
         pass
 
     # User queries -------------------------------------------------------------------------
     @abstractmethod
-    def get_all_users(self):
+    def get_all_users(self, limit=None, offset=None, stream=False, model=None):
+        pass
+
+    @abstractmethod
+    def count_users(self):
         pass
 
     @abstractmethod
@@ -94,6 +137,10 @@ class DBQuery(ABC):
     def get_user_by_username(self, username):
         pass
 
+    @abstractmethod
+    def get_user_version(self, user_id):
+        pass
+
     @abstractmethod
     def partial_update_user(self, user_id, new_data):
         pass
@@ -123,6 +170,10 @@ class DBQuery(ABC):
     @abstractmethod
     def create_message(self, sender_id, receiver_id, content):
         pass
+
+    @abstractmethod
+    def bulk_create_messages(self, messages):
+        pass
     
     @abstractmethod
     def delete_message(self, message_id, receiver_id):
@@ -133,52 +184,273 @@ class DBQuery(ABC):
         pass
     
     @abstractmethod
-    def get_all_messages(self, user_id):
+    def get_all_messages(self, user_id, stream=False, model=None):
         pass
 
+# Column converters for RowMapper, module level so every query shares one compiled mapper per shape
+def media_url(path):
+    return f"{settings.MEDIA_URL}{path}"
+
+
+def optional_media_url(path):
+    return media_url(path) if path else path
+
+
+# Listing images always get the media url, user images only when they are set
+listing_converters = {"tags": json.loads, "image": media_url}
+user_converters = {"image": optional_media_url}
+
+
+def row_value(row, name):
+    # Mapped rows are dicts or model records
+    return row.get(name) if isinstance(row, dict) else getattr(row, name, None)
+
+
 class SQLiteDBQuery(DBQuery):
     """Concrete singleton class that implements all the necessary query methods using SQLite.
+
+    Attributes:
+        fuzzy_candidate_limit (int): Max number of trigram index candidates scored by a fuzzy search.
+        fuzzy_match_threshold (float): Min share of the search term's trigrams a fuzzy match must contain.
+        tag_cache_size (int): Max number of Tag name -> id pairs kept in memory.
+        facet_price_buckets (list): Lower bounds of the price histogram buckets, the last bucket has no upper bound.
+        facet_tag_limit (int): Number of tags returned by get_listing_facets.
+        stream_batch_size (int): Number of rows fetched at a time when a query result is streamed.
+        listing_version (int): Changes whenever a listing is created, updated or deleted.
+        listing_counter_version (int): Changes whenever listing_version does or a listing's likes/dislikes change.
+        listings_modified_at (float): Timestamp of the last change to listing_counter_version.
+
+    The listing versions are kept in memory, writes made by other processes are picked up by sync_listing_versions().
     """
 
+    fuzzy_candidate_limit = 200
+    fuzzy_match_threshold = 0.5
+    tag_cache_size = 1024
+    facet_price_buckets = [0, 25, 50, 100, 250, 500, 1000]
+    facet_tag_limit = 10
+    stream_batch_size = 500
+
+    # Tag rows are never renamed or deleted, so a name -> id pair stays valid once committed
+    _tag_id_cache = OrderedDict()
+    _tag_id_cache_lock = threading.Lock()
+
+    # Cached listing results are keyed by these versions, so a write makes older entries unreachable
+    listing_version = 0
+    listing_counter_version = 0
+    listings_modified_at = time.time()
+    _listing_versions = itertools.count(1)
+
+    # Listing id -> (version, timestamp) of the last write to that listing, listings that weren't
+    # written since the process started (or since delete_all_listings) share the floor version
+    _listing_row_versions = {}
+    _listing_row_floor = (0, listings_modified_at)
+
+    # Last version of the ListingVersion row (shared by every process) this process has caught up with
+    _shared_listing_version = None
+    _listing_version_lock = threading.Lock()
+
+    # Callbacks notified after every listing write (see add_listing_listener)
+    _listing_listeners = []
+
+    def add_listing_listener(self, callback):
+        """Registers a callback that is called after every committed listing write, ex. to invalidate a cache.
+
+        Args:
+            callback (callable): Called with the written listing ids (None if every listing may have changed)
+                and the written fields (None if listings were created or deleted).
+        """
+        self._listing_listeners.append(callback)
+
+    def _listings_changed(self, listing_ids=None, fields=None):
+        """Moves the listing versions forward after a write, once it is committed.
+
+        Inside a transaction scope this waits for the commit, so other requests can't cache the
+        old rows again between the invalidation and the commit.
+
+        Args:
+            listing_ids (iterable, optional): The listings that were written, None if every listing may have changed.
+            fields (set, optional): The columns that were updated, None if listings were created or deleted.
+        """
+        if listing_ids is not None:
+            listing_ids = list(listing_ids)
+
+        # Move the shared version forward in the same transaction, so other processes see the write too
+        rows = self.db_connection.execute_query(
+            "UPDATE ListingVersion SET version = version + 1 WHERE id = 1 RETURNING version"
+        )
+        shared_version = rows[0]["version"] if rows else None
+        self.db_connection.on_commit(lambda: self._bump_listing_versions(listing_ids, fields, shared_version))
+
+    def sync_listing_versions(self):
+        """Catches up with the listing writes made by other processes, with a single read.
+
+        Every listing write also moves the shared ListingVersion row forward. If it moved past the last
+        version this process knows of, another process wrote listings and every listing version moves
+        forward, which invalidates the caches keyed by them. Call it before reading the versions for a request.
+        """
+        rows = self.db_connection.execute_query("SELECT version FROM ListingVersion WHERE id = 1")
+        version = rows[0]["version"] if rows else 0
+        known = self._shared_listing_version
+        if known is None or version > known:
+            self._bump_listing_versions(None, None, version)
+
+    def _bump_listing_versions(self, listing_ids, fields, shared_version=None):
+        with self._listing_version_lock:
+            if shared_version is not None:
+                # Any version skipped since the last one this process knows of was written by another process,
+                # so which listings changed is unknown
+                known = self._shared_listing_version
+                if known is None or shared_version != known + 1:
+                    listing_ids, fields = None, None
+                self._shared_listing_version = max(known or 0, shared_version)
+
+            version = next(self._listing_versions)
+            modified_at = time.time()
+            self.listing_counter_version = version
+            self.listings_modified_at = modified_at
+            # Likes/dislikes change far more often than anything else, so they don't move listing_version
+            if fields is None or not set(fields) <= {"likes", "dislikes"}:
+                self.listing_version = version
+
+            if listing_ids is None:
+                self._listing_row_versions.clear()
+                self._listing_row_floor = (version, modified_at)
+            else:
+                listing_ids = [int(listing_id) for listing_id in listing_ids]
+                for listing_id in listing_ids:
+                    self._listing_row_versions[listing_id] = (version, modified_at)
+
+        for callback in self._listing_listeners:
+            callback(listing_ids, fields)
+
+    def get_listing_version(self, listing_id):
+        """Gets the version of a single listing, which changes whenever that listing is written.
+
+        Args:
+            listing_id (int): The ID of the listing.
+
+        Returns:
+            tuple: The listing's version (int) and the timestamp (float) it was last modified at.
+        """
+        return self._listing_row_versions.get(int(listing_id), self._listing_row_floor)
+
+    def _map_rows(self, rows, model=None, converters=None):
+        """Turns query rows into dicts (or model records) with the RowMapper compiled for the result's columns.
+
+        Args:
+            rows (list): The sqlite3.Row results.
+            model (type, optional): The record type (ex. api.models.Listing). Defaults to dicts.
+            converters (dict, optional): Column name -> function applied to that column's value.
+
+        Returns:
+            list: A dict (or record) per row.
+        """
+        if not rows:
+            return []
+        return RowMapper.get(rows[0].keys(), model, converters).map_rows(rows)
+
+    def _map_first_row(self, rows, model=None, converters=None):
+        # Single row lookups -> the first row mapped like _map_rows, or None if there are no rows
+        if not rows:
+            return None
+        return RowMapper.get(rows[0].keys(), model, converters).map_row(rows[0])
+
+    def _iter_batches(self, fetch_batch, key):
+        """Yields rows fetched a batch at a time, each batch by its own short keyset query.
+
+        A connection is only checked out while a batch is fetched, so a slow reader never holds one
+        and only one batch of rows is in memory at a time.
+
+        Args:
+            fetch_batch (callable): Takes (after, limit) and returns up to that many mapped rows after the
+                given key (from the start if it is None).
+            key (callable): Returns the key of a mapped row, passed as `after` for the next batch.
+
+        Yields:
+            The mapped rows.
+        """
+        after = None
+        while True:
+            rows = fetch_batch(after, self.stream_batch_size)
+            yield from rows
+            if len(rows) < self.stream_batch_size:
+                return
+            after = key(rows[-1])
+
+    def _stream_rows(self, query, params, model=None, converters=None, id_column="id"):
+        """Streams a SELECT's rows in id order, a batch at a time instead of loading the whole result.
+
+        Args:
+            query (str): The SELECT query, with a WHERE clause and no ORDER BY/LIMIT (the batches add them).
+            params (list): The query parameters.
+            model (type, optional): The record type (ex. api.models.Listing). Defaults to dicts.
+            converters (dict, optional): Column name -> function applied to that column's value.
+            id_column (str, optional): The unique, indexed column the batches seek through.
+
+        Returns:
+            generator: The mapped rows.
+        """
+        id_name = id_column.rsplit(".", 1)[-1]
+
+        def fetch_batch(after, limit):
+            seek, seek_params = (f" AND {id_column} > ?", [after]) if after is not None else ("", [])
+            with self.db_connection as db:
+                rows = db.execute_query(f"{query}{seek} ORDER BY {id_column} LIMIT ?", [*params, *seek_params, limit])
+            return self._map_rows(rows, model, converters)
+
+        return self._iter_batches(fetch_batch, lambda row: row_value(row, id_name))
+
     # Listing methods
     def get_all_listings(self):
         query = """
-        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at,
-        GROUP_CONCAT(t.name) AS tags
-        FROM Listing l
-        LEFT JOIN ListingTag lt ON l.id = lt.listing_id
-        LEFT JOIN Tag t ON lt.tag_id = t.id
-        GROUP BY l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at;
+        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at, l.tags
+        FROM Listing l;
         """
 
         with self.db_connection as db:
             rows = db.execute_query(query)
 
-        listings = []
-        for row in rows:
-            listing = {column: row[column] for column in row.keys() if column != "tags"}
-            listing["tags"] = row["tags"].split(",") if row["tags"] else []
-            listing["image"] = f"{settings.MEDIA_URL}{listing['image']}"
+        return self._map_rows(rows, converters=listing_converters)
 
-            listings.append(listing)
-        return listings
+    def _build_listing_filters(self, filters=None, search_term=None, fuzzy_matches=None):
+        """Builds the WHERE clauses shared by the filtered listing queries.
 
-    def get_filtered_listings(self, filters=None, search_term=None, ordering=None):
-        query = """
-        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at,
-        GROUP_CONCAT(t.name) AS tags
-        FROM Listing l
-        LEFT JOIN ListingTag lt ON l.id = lt.listing_id
-        LEFT JOIN Tag t ON lt.tag_id = t.id
-        WHERE 1=1 --<filters>
-        GROUP BY l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at
-        """
+        Args:
+            filters (dict, optional): Column filters, min_/max_ prefixes become range filters.
+                "tags" (list of tag names) and "tags_match" ("any" or "all") filter by tag.
+            search_term (str, optional): Term matched against the title, description and tag names.
+            fuzzy_matches (list, optional): (listing id, rank) pairs from a fuzzy search, used instead of the search term.
 
+        Returns:
+            tuple: The filter clauses (str) and their params (list).
+        """
         params = []
 
         filter_clauses = ""
         # Apply filters to the query
         if filters:
+            filters = dict(filters)
+            tags = filters.pop("tags", None)
+            tags_match = filters.pop("tags_match", None)
+
+            # Tag filters read the tags' posting lists from the ListingTag (tag_id, listing_id) index
+            if tags:
+                tags = list(dict.fromkeys(tags))
+                placeholders = ", ".join("?" for _ in tags)
+                tag_clause = f"""
+                    SELECT lt.listing_id
+                    FROM Tag t
+                    INNER JOIN ListingTag lt ON lt.tag_id = t.id
+                    WHERE t.name IN ({placeholders})"""
+                params.extend(tags)
+
+                # All of the tags -> the listing must appear in every posting list
+                if tags_match == "all" and len(tags) > 1:
+                    tag_clause += " GROUP BY lt.listing_id HAVING COUNT(*) = ?"
+                    params.append(len(tags))
+
+                filter_clauses += f" AND l.id IN ({tag_clause})"
+
             for field, value in filters.items():
                 operator = "="
                 if field.startswith("min"):
@@ -190,59 +462,434 @@ class SQLiteDBQuery(DBQuery):
                     field = field[(field.find("_")+1):]
                     value = int(value)
 
-                filter_clauses += f" AND {field} {operator} ?"
+                filter_clauses += f" AND l.{field} {operator} ?"
                 params.append(value)
 
-        # Apply search term if provided (e.g., filter by title or description)
-        if search_term:
-            filter_clauses += (
-                " AND (title LIKE ? OR description LIKE ? OR t.name LIKE ?)"
+        # Fuzzy search already found the matching listings
+        if fuzzy_matches is not None:
+            if fuzzy_matches:
+                placeholders = ", ".join("?" for _ in fuzzy_matches)
+                filter_clauses += f" AND l.id IN ({placeholders})"
+                params.extend(listing_id for listing_id, _ in fuzzy_matches)
+            else:
+                filter_clauses += " AND 0"
+        # Apply search term if provided (matches the title, description or tags through the full text index)
+        elif search_term:
+            match_query = self._build_search_match(search_term)
+            if match_query:
+                filter_clauses += " AND l.id IN (SELECT rowid FROM ListingSearch WHERE ListingSearch MATCH ?)"
+                params.append(match_query)
+            else:
+                # Nothing searchable in the term (ex. only punctuation) -> no results
+                filter_clauses += " AND 0"
+
+        return filter_clauses, params
+
+    def _build_search_match(self, search_term):
+        """Turns a user's search term into an FTS5 MATCH expression.
+
+        Each word is quoted (so FTS syntax characters in user input can't cause errors) and
+        matched as a prefix. Words are AND-ed together.
+
+        Args:
+            search_term (str): The raw search term.
+
+        Returns:
+            str: The MATCH expression, or None if the term has no words.
+        """
+        words = re.findall(r"[^\W_]+", search_term)
+        if not words:
+            return None
+        return " ".join(f'"{word}"*' for word in words)
+
+    def _get_trigrams(self, text):
+        """Gets the set of lowercase 3 character sequences in each word of the text."""
+        trigrams = set()
+        for word in re.findall(r"[^\W_]+", text.lower()):
+            trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+        return trigrams
+
+    def get_fuzzy_matches(self, search_term):
+        """Finds listings whose title or tags are similar to the search term, even when misspelled.
+
+        Candidates sharing trigrams with the term are pulled from the ListingTrigram index (best BM25 first,
+        bounded by fuzzy_candidate_limit), then scored by the share of the term's trigrams they contain.
+        Recall is capped by that limit: only the top fuzzy_candidate_limit (200) candidates by BM25 are scored,
+        so when more listings share the term's trigrams some similar ones can be missed.
+        The result can be passed to get_filtered_listings/count_filtered_listings so they don't search again.
+
+        Args:
+            search_term (str): The raw search term.
+
+        Returns:
+            list: (listing id, rank) pairs sorted best match first, rank is the negated similarity so
+                lower is better (like bm25). None if the term is too short for trigram matching.
+        """
+        term_trigrams = self._get_trigrams(search_term)
+        if not term_trigrams:
+            return None
+
+        query = """
+        SELECT rowid AS id, title, tags FROM ListingTrigram
+        WHERE ListingTrigram MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """
+        match_query = " OR ".join(f'"{trigram}"' for trigram in sorted(term_trigrams))
+
+        with self.db_connection as db:
+            rows = db.execute_query(query, (match_query, self.fuzzy_candidate_limit))
+
+        matches = []
+        for row in rows:
+            listing_trigrams = self._get_trigrams(f"{row['title']} {row['tags']}")
+            similarity = len(term_trigrams & listing_trigrams) / len(term_trigrams)
+            if similarity >= self.fuzzy_match_threshold:
+                matches.append((row["id"], -similarity))
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def _refresh_search_index(self, db, listing_id):
+        """Re-indexes a listing's title, description and tags in the ListingSearch full text index.
+
+        Args:
+            db (DBConnection): The connection currently in use.
+            listing_id (int): The ID of the listing to re-index.
+        """
+        db.execute_query("DELETE FROM ListingSearch WHERE rowid = ?", (listing_id,))
+        db.execute_query(
+            """
+            INSERT INTO ListingSearch (rowid, title, description, tags)
+            SELECT l.id, l.title, l.description, (SELECT COALESCE(GROUP_CONCAT(value, ' '), '') FROM json_each(l.tags))
+            FROM Listing l
+            WHERE l.id = ?
+            """,
+            (listing_id,),
+        )
+        db.execute_query("DELETE FROM ListingTrigram WHERE rowid = ?", (listing_id,))
+        db.execute_query(
+            """
+            INSERT INTO ListingTrigram (rowid, title, tags)
+            SELECT l.id, l.title, (SELECT COALESCE(GROUP_CONCAT(value, ' '), '') FROM json_each(l.tags))
+            FROM Listing l
+            WHERE l.id = ?
+            """,
+            (listing_id,),
+        )
+
+    def _index_new_listings(self, db, listing_ids):
+        """Indexes newly created listings, with one insert per search table.
+
+        Args:
+            db (DBConnection): The connection currently in use.
+            listing_ids (list): The IDs of the new listings.
+        """
+        listing_ids = json.dumps(list(listing_ids))
+        db.execute_query(
+            """
+            INSERT INTO ListingSearch (rowid, title, description, tags)
+            SELECT l.id, l.title, l.description, (SELECT COALESCE(GROUP_CONCAT(value, ' '), '') FROM json_each(l.tags))
+            FROM Listing l
+            WHERE l.id IN (SELECT value FROM json_each(?))
+            """,
+            (listing_ids,),
+        )
+        db.execute_query(
+            """
+            INSERT INTO ListingTrigram (rowid, title, tags)
+            SELECT l.id, l.title, (SELECT COALESCE(GROUP_CONCAT(value, ' '), '') FROM json_each(l.tags))
+            FROM Listing l
+            WHERE l.id IN (SELECT value FROM json_each(?))
+            """,
+            (listing_ids,),
+        )
+
+    def _get_tag_ids(self, db, tag_names):
+        """Gets the Tag ids for a list of tag names, creating any tags that don't exist yet.
+
+        Cached names cost no queries, the rest are resolved with one multi-row insert and one select.
+        The caller passes the result to _cache_tag_ids once the transaction commits.
+
+        Args:
+            db (DBConnection): The connection currently in use.
+            tag_names (list): The tag names to look up.
+
+        Returns:
+            dict: Tag name -> tag id for every name in tag_names.
+        """
+        tag_ids = {}
+        with self._tag_id_cache_lock:
+            for name in tag_names:
+                if name in self._tag_id_cache:
+                    self._tag_id_cache.move_to_end(name)
+                    tag_ids[name] = self._tag_id_cache[name]
+
+        missing = json.dumps([name for name in tag_names if name not in tag_ids])
+        if missing != "[]":
+            db.connection.execute(
+                "INSERT OR IGNORE INTO Tag (name) SELECT value FROM json_each(?)", (missing,)
+            )
+            rows = db.execute_query(
+                "SELECT id, name FROM Tag WHERE name IN (SELECT value FROM json_each(?))", (missing,)
             )
-            params.extend([f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"])
+            tag_ids.update({row["name"]: row["id"] for row in rows})
+        return tag_ids
 
-        query = query.replace("--<filters>", filter_clauses)
+    def _cache_tag_ids(self, tag_ids):
+        """Remembers committed Tag name -> id pairs, evicting the least recently used ones past tag_cache_size.
+
+        Args:
+            tag_ids (dict): Tag name -> tag id.
+        """
+        with self._tag_id_cache_lock:
+            for name, tag_id in tag_ids.items():
+                self._tag_id_cache[name] = tag_id
+                self._tag_id_cache.move_to_end(name)
+            while len(self._tag_id_cache) > self.tag_cache_size:
+                self._tag_id_cache.popitem(last=False)
+
+    def _add_listing_tags(self, db, listing_id, tag_ids):
+        """Links a listing to a set of tags with a single insert.
+
+        Args:
+            db (DBConnection): The connection currently in use.
+            listing_id (int): The ID of the listing.
+            tag_ids (iterable): The Tag ids to link.
+        """
+        db.connection.execute(
+            "INSERT OR IGNORE INTO ListingTag (listing_id, tag_id) SELECT ?, value FROM json_each(?)",
+            (listing_id, json.dumps(list(tag_ids))),
+        )
+
+    def _parse_listing_ordering(self, ordering=None):
+        """Splits an ordering string such as "-price" into its column and direction.
+
+        Args:
+            ordering (str, optional): A listing column, prefixed with '-' for descending order.
+
+        Returns:
+            tuple: The column name (None if not a valid ordering) and True if descending.
+        """
+        if not ordering:
+            return None, False
+
+        # Prefix with '-' for descending order
+        descending = ordering.startswith("-")
+        field_name = ordering.lstrip("-")  # Remove '-' if exists
+
+        # Ensure the field name is valid
+        valid_fields = [
+            "title",
+            "condition",
+            "description",
+            "price",
+            "likes",
+            "dislikes",
+            "created_at",
+            "relevance",
+        ]
+        if field_name.lower() not in valid_fields:
+            return None, False
+        return field_name.lower(), descending
+
+    def get_filtered_listings(self, filters=None, search_term=None, ordering=None, limit=None, offset=None, after=None, search_mode=None, stream=False, model=None, fuzzy_matches=None):
+        """Retrieves listings matching the given filters/search, in the given order.
+
+        Args:
+            filters (dict, optional): Column filters, min_/max_ prefixes become range filters.
+            search_term (str, optional): Term matched against the title, description and tag names.
+            ordering (str, optional): Column to order by (or "relevance" when searching), prefixed with '-' for descending order.
+            limit (int, optional): Max number of listings to return. Defaults to all of them.
+            offset (int, optional): Number of listings to skip (offset pagination).
+            after (tuple, optional): The (sort value, id) of the last listing of the previous page.
+                Only listings after it are returned (keyset pagination), which lets the query seek
+                through an index instead of skipping rows.
+            search_mode (str, optional): "fuzzy" for typo tolerant search on titles and tags (ordered by
+                similarity unless another ordering is given), full text search otherwise.
+            stream (bool, optional): Return a generator that fetches every listing in batches (keyset queries of
+                stream_batch_size listings) instead of a list, limit and offset are ignored.
+            model (type, optional): Build these records (ex. api.models.Listing) instead of dicts.
+            fuzzy_matches (list, optional): get_fuzzy_matches(search_term) if it was already called (ex. for the
+                count of the same search). Found here otherwise.
+
+        Returns:
+            list: A list of listing dicts or records (a generator of them if streaming).
+        """
+        if fuzzy_matches is None and search_term and search_mode == "fuzzy":
+            fuzzy_matches = self.get_fuzzy_matches(search_term)
+        filter_clauses, params = self._build_listing_filters(filters, search_term, fuzzy_matches)
 
         # Apply ordering if provided
-        if ordering:
-            # Prefix with '-' for descending order
-            descending = ordering.startswith("-")
-            field_name = ordering.lstrip("-")  # Remove '-' if exists
-
-            # Ensure the field name is valid
-            valid_fields = [
-                "title",
-                "condition",
-                "description",
-                "price",
-                "likes",
-                "dislikes",
-                "created_at",
-            ]
-            if field_name.lower() in valid_fields:
-                query += f" ORDER BY {field_name}"
-                if descending:
-                    query += " DESC"
-                else:
-                    query += " ASC"
+        if fuzzy_matches is not None and not ordering:
+            ordering = "relevance"
+        field_name, descending = self._parse_listing_ordering(ordering)
+
+        # Streams fetch the listings a batch at a time, each batch seeks past the previous one's last listing
+        if stream:
+            def fetch_batch(after, limit):
+                return self.get_filtered_listings(
+                    filters, search_term, ordering, limit=limit, after=after, search_mode=search_mode, model=model, fuzzy_matches=fuzzy_matches
+                )
+
+            return self._iter_batches(
+                fetch_batch, lambda listing: (row_value(listing, field_name) if field_name else None, row_value(listing, "id"))
+            )
+
+        direction = "DESC" if descending else "ASC"
+        sort_column = f"l.{field_name}" if field_name else None
+
+        # Relevance ordering ranks matches with BM25 (lower is more relevant), title matches weigh the most
+        relevance_join = ""
+        relevance_column = ""
+        match_query = self._build_search_match(search_term) if search_term else None
+        if field_name == "relevance":
+            sort_column = None
+            if fuzzy_matches:
+                # Rank fuzzy matches by their similarity
+                values = ", ".join("(?, ?)" for _ in fuzzy_matches)
+                relevance_join = f"""
+                INNER JOIN (
+                    SELECT column1 AS listing_id, column2 AS rank FROM (VALUES {values})
+                ) s ON s.listing_id = l.id"""
+                relevance_column = ", s.rank AS relevance"
+                sort_column = "s.rank"
+                params[0:0] = [value for match in fuzzy_matches for value in match]
+            elif fuzzy_matches is None and match_query:
+                # LIMIT -1 stops SQLite from flattening the subquery, bm25() only works directly on the FTS query
+                relevance_join = """
+                INNER JOIN (
+                    SELECT rowid AS listing_id, bm25(ListingSearch, 10.0, 1.0, 5.0) AS rank
+                    FROM ListingSearch WHERE ListingSearch MATCH ? LIMIT -1
+                ) s ON s.listing_id = l.id"""
+                relevance_column = ", s.rank AS relevance"
+                sort_column = "s.rank"
+                params.insert(0, match_query)
+
+        query = f"""
+        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at,
+        l.tags{relevance_column}
+        FROM Listing l{relevance_join}
+        WHERE 1=1 --<filters>
+        """
+
+        # Seek past the previous page's last row, the comparison matches the ORDER BY below
+        if after is not None:
+            after_value, after_id = after
+            operator = "<" if (descending and sort_column) else ">"
+            if sort_column:
+                filter_clauses += f" AND ({sort_column}, l.id) {operator} (?, ?)"
+                params.extend([after_value, after_id])
+            else:
+                filter_clauses += f" AND l.id {operator} ?"
+                params.append(after_id)
+
+        query = query.replace("--<filters>", filter_clauses)
+
+        # Listing id breaks ties so pages are stable when paginating
+        if sort_column:
+            query += f" ORDER BY {sort_column} {direction}, l.id {direction}"
+        else:
+            query += " ORDER BY l.id ASC"
+
+        # Only fetch the requested slice of rows
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset or 0])
 
         with self.db_connection as db:
             rows = db.execute_query(query, params)
 
-        listings = []
-        for row in rows:
-            listing = {column: row[column] for column in row.keys() if column != "tags"}
-            listing["tags"] = row["tags"].split(",") if row["tags"] else []
-            listing["image"] = f"{settings.MEDIA_URL}{listing['image']}"
+        return self._map_rows(rows, model, listing_converters)
+
+    def count_filtered_listings(self, filters=None, search_term=None, search_mode=None, fuzzy_matches=None):
+        if fuzzy_matches is None and search_term and search_mode == "fuzzy":
+            fuzzy_matches = self.get_fuzzy_matches(search_term)
+        filter_clauses, params = self._build_listing_filters(filters, search_term, fuzzy_matches)
 
-            listings.append(listing)
-        return listings
+        query = f"SELECT COUNT(*) AS total FROM Listing l WHERE 1=1 {filter_clauses}"
+
+        with self.db_connection as db:
+            rows = db.execute_query(query, params)
+        return rows[0]["total"]
+
+    def get_listing_facets(self, filters=None, search_term=None, search_mode=None):
+        """Counts the listings matching a set of filters/search by condition, price bucket and tag.
+
+        The matching listings are found once (materialized) and every facet is aggregated from them
+        in the same statement.
+
+        Args:
+            filters (dict, optional): Same filters as get_filtered_listings.
+            search_term (str, optional): Same search term as get_filtered_listings.
+            search_mode (str, optional): Same search mode as get_filtered_listings.
+
+        Returns:
+            dict: The total count, counts per condition, price buckets (min, max, count) and the most used tags.
+        """
+        fuzzy_matches = None
+        if search_term and search_mode == "fuzzy":
+            fuzzy_matches = self.get_fuzzy_matches(search_term)
+        filter_clauses, filter_params = self._build_listing_filters(filters, search_term, fuzzy_matches)
+
+        # Bucket index of a price, ex. 30 -> 1 with the default buckets (25 - 50)
+        bounds = self.facet_price_buckets
+        bucket_case = " ".join(f"WHEN price < ? THEN {index - 1}" for index in range(1, len(bounds)))
+        bucket_case = f"CASE {bucket_case} ELSE {len(bounds) - 1} END"
+
+        query = f"""
+        WITH matched AS MATERIALIZED (
+            SELECT l.condition, l.price, l.tags
+            FROM Listing l
+            WHERE 1=1 {filter_clauses}
+        )
+        SELECT 'total' AS facet, NULL AS value, COUNT(*) AS count FROM matched
+        UNION ALL
+        SELECT 'condition', condition, COUNT(*) FROM matched GROUP BY condition
+        UNION ALL
+        SELECT 'price', {bucket_case}, COUNT(*) FROM matched GROUP BY 2
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'tag', tag.value, COUNT(*) AS count
+            FROM matched, json_each(matched.tags) tag
+            GROUP BY tag.value
+            ORDER BY count DESC, tag.value
+            LIMIT ?
+        )
+        """
+        params = filter_params + bounds[1:] + [self.facet_tag_limit]
+
+        with self.db_connection as db:
+            rows = db.execute_query(query, params)
+
+        price_counts = {}
+        facets = {"count": 0, "conditions": {}, "price_buckets": [], "tags": []}
+        for row in rows:
+            if row["facet"] == "total":
+                facets["count"] = row["count"]
+            elif row["facet"] == "condition":
+                facets["conditions"][row["value"]] = row["count"]
+            elif row["facet"] == "price":
+                price_counts[row["value"]] = row["count"]
+            else:
+                facets["tags"].append({"name": row["value"], "count": row["count"]})
+
+        # Empty buckets are included so the histogram always has the same shape
+        for index, lower_bound in enumerate(bounds):
+            upper_bound = bounds[index + 1] if index + 1 < len(bounds) else None
+            facets["price_buckets"].append(
+                {"min": lower_bound, "max": upper_bound, "count": price_counts.get(index, 0)}
+            )
+        return facets
 
     def create_listing(self, data, user_id):
         listing_data = {key: value for key, value in data.items() if key != "tags"}
         query = """
-        INSERT INTO Listing (title, condition, description, price, image, author_id)
-        VALUES (?, ?, ?, ?, ?, ?);
+        INSERT INTO Listing (title, condition, description, price, image, author_id, tags)
+        VALUES (?, ?, ?, ?, ?, ?, ?);
         """
+        # Duplicate tags would violate the ListingTag primary key
+        tags = list(dict.fromkeys(data.get("tags") or []))
         # Likes and dislikes are set to 0 when created in db
         params = (
             listing_data["title"],
@@ -251,9 +898,12 @@ class SQLiteDBQuery(DBQuery):
             listing_data["price"],
             listing_data["image"],
             user_id,
+            # Tag names are also stored on the listing row so reads don't need to join the tag tables
+            json.dumps(tags),
         )
 
-        with self.db_connection as db:
+        # The listing, its tags and its search index entries are committed together
+        with self.db_connection.transaction() as db:
             cursor = db.connection.cursor()
             # Add listing
             cursor.execute(query, params)
@@ -261,73 +911,87 @@ class SQLiteDBQuery(DBQuery):
             # Get id of inserted listing
             listing_id = cursor.lastrowid
 
-            # Add tags
-            # If tag doesn't exit, add it to the Tag table
-            tag_query = "INSERT OR IGNORE INTO Tag (name) VALUES (?);"
-            for tag in data["tags"]:
-                cursor.execute(tag_query, (tag,))
-                # Get relevent tag id
-                tag_id = cursor.execute(
-                    "SELECT id FROM Tag WHERE name = ?", (tag,)
-                ).fetchone()[0]
-
-                # Add tag to listing
-                listing_tag_query = (
-                    "INSERT INTO ListingTag (listing_id, tag_id) VALUES (?, ?);"
-                )
-                cursor.execute(listing_tag_query, (listing_id, tag_id))
+            # Add tags (creating any that don't exist yet) as a set
+            tag_ids = self._get_tag_ids(db, tags)
+            if tag_ids:
+                self._add_listing_tags(db, listing_id, tag_ids.values())
+            db.on_commit(lambda: self._cache_tag_ids(tag_ids))
+
+            # Make the listing searchable
+            self._refresh_search_index(db, listing_id)
+            self._listings_changed(listing_ids=[listing_id])
+        return listing_id
+
+    def bulk_create_listings(self, listings, user_id):
+        """Creates many listings, with their tags and search index entries, in one transaction.
+
+        Everything is committed once. The listings are inserted one row at a time to get each new id back,
+        the tags and search index entries are then written with one batched statement per table.
+
+        Args:
+            listings (list): Listing data dicts, like the data passed to create_listing.
+            user_id (int): The ID of the user who is the author of the listings.
+
+        Returns:
+            list: The new listing ids, in the same order as listings.
+        """
+        if not listings:
+            return []
+
+        rows = []
+        listing_tags = []
+        for data in listings:
+            # Duplicate tags would violate the ListingTag primary key
+            tags = list(dict.fromkeys(data.get("tags") or []))
+            listing_tags.append(tags)
+            rows.append(
+                (data["title"], data["condition"], data["description"], data["price"], data["image"], user_id, json.dumps(tags))
+            )
 
-            # Save change
-            db.connection.commit()
-            return listing_id
+        query = """
+        INSERT INTO Listing (title, condition, description, price, image, author_id, tags)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        RETURNING id;
+        """
+        with self.db_connection.transaction(immediate=True) as db:
+            listing_ids = [db.execute_query(query, row)[0]["id"] for row in rows]
+
+            # Resolve every distinct tag at once, then link them all in one batch
+            tag_ids = self._get_tag_ids(db, list(dict.fromkeys(name for tags in listing_tags for name in tags)))
+            db.execute_many(
+                "INSERT OR IGNORE INTO ListingTag (listing_id, tag_id) VALUES (?, ?)",
+                [(listing_id, tag_ids[name]) for listing_id, tags in zip(listing_ids, listing_tags) for name in tags],
+            )
+            db.on_commit(lambda: self._cache_tag_ids(tag_ids))
+
+            # Make the listings searchable
+            self._index_new_listings(db, listing_ids)
+            self._listings_changed(listing_ids=listing_ids)
+        return listing_ids
 
     def get_listing_by_id(self, listing_id):
         query = """
-        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at,
-        GROUP_CONCAT(t.name) AS tags
+        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at, l.tags
         FROM Listing l
-        LEFT JOIN ListingTag lt ON l.id = lt.listing_id
-        LEFT JOIN Tag t ON lt.tag_id = t.id
-        WHERE l.id = ?
-        GROUP BY l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at;
+        WHERE l.id = ?;
         """
 
         with self.db_connection as db:
             rows = db.execute_query(query, (listing_id,))
 
-        if not rows:
-            return None
-
-        row = rows[0]
-        listing = {column: row[column] for column in row.keys() if column != "tags"}
-        listing["tags"] = row["tags"].split(",") if row["tags"] else []
-        listing["image"] = f"{settings.MEDIA_URL}{listing['image']}"
-
-        return listing
+        return self._map_first_row(rows, converters=listing_converters)
 
     def get_listing_by_author_id(self, author_id):
         query = """
-        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at,
-        GROUP_CONCAT(t.name) AS tags
+        SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at, l.tags
         FROM Listing l
-        LEFT JOIN ListingTag lt ON l.id = lt.listing_id
-        LEFT JOIN Tag t ON lt.tag_id = t.id
-        WHERE l.author_id = ?
-        GROUP BY l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at;
+        WHERE l.author_id = ?;
         """
 
         with self.db_connection as db:
             rows = db.execute_query(query, (author_id,))
 
-        listings = []
-        for row in rows:
-            listing_dict = {
-                column: row[column] for column in row.keys() if column != "tags"
-            }
-            listing_dict["tags"] = row["tags"].split(",") if row["tags"] else []
-            listings.append(listing_dict)
-
-        return listings
+        return self._map_rows(rows, converters=listing_converters)
 
     def partial_update_listing(self, listing_id, new_data):
         # Get tag(s) data if it exists
@@ -337,6 +1001,11 @@ class SQLiteDBQuery(DBQuery):
         exclude = ["id", "likes", "dislikes"]
         new_data = {key: value for key, value in new_data.items() if key not in exclude}
 
+        # The tag column on the listing row mirrors the ListingTag rows
+        if tags:
+            tags = list(dict.fromkeys(tags))
+            new_data["tags"] = json.dumps(tags)
+
         # Dynamically generate a string for each column
         columns = ", ".join(f"{key} = ?" for key in new_data.keys())
         
@@ -344,40 +1013,63 @@ class SQLiteDBQuery(DBQuery):
         query = f"UPDATE Listing SET {columns} WHERE id = ?"
         params = tuple(new_data.values()) + (listing_id,)
 
-        with self.db_connection as db:
+        # The columns, tags and search index are committed together, so readers never see a half-updated listing
+        with self.db_connection.transaction() as db:
             if new_data:
                 db.execute_query(query, params)
 
-            # Update tags
+            # Update tags by diffing against the listing's current tag set
+            tags_changed = False
             if tags:
-                # Remove existing tags for the listing
-                delete_query = "DELETE FROM ListingTag WHERE listing_id = ?"
-                db.execute_query(delete_query, (listing_id,))
-
-                # Add new tags
-                for tag in tags:
-                    # If tag doesn't exit, add it to the Tag table
-                    tag_query = "INSERT OR IGNORE INTO Tag (name) VALUES (?);"
-                    db.execute_query(tag_query, (tag,))
+                rows = db.execute_query(
+                    """
+                    SELECT t.id, t.name
+                    FROM ListingTag lt
+                    INNER JOIN Tag t ON lt.tag_id = t.id
+                    WHERE lt.listing_id = ?
+                    """,
+                    (listing_id,),
+                )
+                existing_tags = {row["name"]: row["id"] for row in rows}
 
-                    tag_id_query = "SELECT id FROM Tag WHERE name = ?;"
-                    tag_id = db.execute_query(tag_id_query, (tag,))[0]["id"]
+                removed_ids = [tag_id for name, tag_id in existing_tags.items() if name not in tags]
+                added_tags = [name for name in tags if name not in existing_tags]
 
-                    listing_tag_query = (
-                        "INSERT INTO ListingTag (listing_id, tag_id) VALUES (?, ?);"
+                if removed_ids:
+                    db.connection.execute(
+                        "DELETE FROM ListingTag WHERE listing_id = ? AND tag_id IN (SELECT value FROM json_each(?))",
+                        (listing_id, json.dumps(removed_ids)),
                     )
-                    db.execute_query(listing_tag_query, (listing_id, tag_id))
+
+                added_tag_ids = self._get_tag_ids(db, added_tags) if added_tags else {}
+                if added_tag_ids:
+                    self._add_listing_tags(db, listing_id, added_tag_ids.values())
+
+                db.on_commit(lambda: self._cache_tag_ids({**existing_tags, **added_tag_ids}))
+                tags_changed = bool(removed_ids or added_tags)
+
+            # Keep the search index in sync with the new title/description/tags
+            if tags_changed or any(key in new_data for key in ["title", "description"]):
+                self._refresh_search_index(db, listing_id)
+
+            self._listings_changed(listing_ids=[listing_id], fields=set(new_data))
 
     def delete_listing(self, listing_id):
         query = "DELETE FROM listing WHERE id = ?"
         params = (listing_id,)
-        with self.db_connection as db:
+        with self.db_connection.transaction() as db:
             db.execute_query(query, params)
+            db.execute_query("DELETE FROM ListingSearch WHERE rowid = ?", params)
+            db.execute_query("DELETE FROM ListingTrigram WHERE rowid = ?", params)
+            self._listings_changed(listing_ids=[listing_id])
 
     def delete_all_listings(self):
         query = "DELETE FROM listing"
-        with self.db_connection as db:
+        with self.db_connection.transaction() as db:
             db.execute_query(query)
+            db.execute_query("DELETE FROM ListingSearch")
+            db.execute_query("DELETE FROM ListingTrigram")
+            self._listings_changed()
 
     '''
     Favorite Listing Content
@@ -391,6 +1083,22 @@ class SQLiteDBQuery(DBQuery):
         with self.db_connection as db:
             db.execute_query(query, params)
     
+    def bulk_add_favorite_listings(self, favorites):
+        """Favorites many listings in one batched insert, skipping pairs that are already favorites.
+
+        Args:
+            favorites (iterable): (user_id, listing_id) pairs.
+
+        Returns:
+            int: The number of favorites added.
+        """
+        query = """
+            INSERT OR IGNORE INTO UserFavoriteListing (user_id, listing_id)
+            VALUES (?, ?)
+            """
+        with self.db_connection.transaction() as db:
+            return db.execute_many(query, favorites)
+
     #Function: query to remove a favorite listing 
     def remove_favorite_listing(self, user_id, listing_id):
         """
@@ -413,74 +1121,98 @@ class SQLiteDBQuery(DBQuery):
             db.execute_query(query, params)
 
     #Function: query to retrieve a list of the user's favorite listings 
-    def retrieve_favorite_listings(self, user_id):
+    def retrieve_favorite_listings(self, user_id, stream=False):
         """
         Retrieves all favorite listings for a given user.
 
         Args:
             user_id (int): The ID of the user whose favorites are being fetched.
+            stream (bool, optional): Return a stream that fetches the listings in batches instead of a list.
 
         Returns:
-            list: A list of dictionaries containing details of the user's favorite listings.
+            list: A list of dictionaries containing details of the user's favorite listings (a generator of them if streaming).
         """
         query = """
-            SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at,
-            GROUP_CONCAT(t.name) AS tags
+            SELECT l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at, l.tags
             FROM UserFavoriteListing ufl
             INNER JOIN Listing l ON ufl.listing_id = l.id
-            LEFT JOIN ListingTag lt ON l.id = lt.listing_id
-            LEFT JOIN Tag t ON lt.tag_id = t.id
             WHERE ufl.user_id = ?
-            GROUP BY l.id, l.title, l.condition, l.description, l.price, l.image, l.likes, l.dislikes, l.author_id, l.created_at;
         """
         params = (user_id,)
-        
+
+        if stream:
+            return self._stream_rows(query, params, converters=listing_converters, id_column="l.id")
+
         with self.db_connection as db:
             rows = db.execute_query(query, params)
 
         # Process rows into a list of favorite listings
-        favorite_listings = []
-        for row in rows:
-            listing = {column: row[column] for column in row.keys() if column != "tags"}
-            listing["tags"] = row["tags"].split(",") if row["tags"] else []
-            listing["image"] = f"{settings.MEDIA_URL}{listing['image']}"
-            
-            favorite_listings.append(listing)
-
-        return favorite_listings
+        return self._map_rows(rows, converters=listing_converters)
 
     '''
     Like / Dislike Listing Content
     '''
-    def like_listing(self, listing_id, current_likes):
-        query = "UPDATE Listing SET likes = ? WHERE id = ?"
-        params = (current_likes + 1, listing_id)
-
+    def listing_exists(self, listing_id):
+        query = "SELECT 1 FROM Listing WHERE id = ?"
         with self.db_connection as db:
-            db.execute_query(query, params)
+            return bool(db.execute_query(query, (listing_id,)))
 
-    def dislike_listing(self, listing_id, current_dislikes):
-        query = "UPDATE Listing SET dislikes = ? WHERE id = ?"
-        params = (current_dislikes + 1, listing_id)
+    def _increment_counter(self, column, listing_id, amount):
+        # Increment in SQL so concurrent likes can't overwrite each other
+        query = f"UPDATE Listing SET {column} = {column} + ? WHERE id = ?"
+        params = (amount, listing_id)
+
+        with self.db_connection.transaction() as db:
+            cursor = db.connection.cursor()
+            cursor.execute(query, params)
+            self._listings_changed(listing_ids=[listing_id], fields={column})
+        # False if the listing doesn't exist
+        return cursor.rowcount > 0
+
+    def like_listing(self, listing_id, amount=1):
+        return self._increment_counter("likes", listing_id, amount)
+
+    def dislike_listing(self, listing_id, amount=1):
+        return self._increment_counter("dislikes", listing_id, amount)
+
+    def increment_listing_counters(self, increments):
+        """Applies many like/dislike increments in a single transaction.
+
+        Args:
+            increments (dict): Maps listing ids to a (likes, dislikes) tuple of amounts to add.
+        """
+        query = "UPDATE Listing SET likes = likes + ?, dislikes = dislikes + ? WHERE id = ?"
+        params = [(likes, dislikes, listing_id) for listing_id, (likes, dislikes) in increments.items()]
+
+        with self.db_connection.transaction() as db:
+            db.execute_many(query, params)
+            self._listings_changed(listing_ids=increments.keys(), fields={"likes", "dislikes"})
 
-        with self.db_connection as db:
-            db.execute_query(query, params)
-    
     # User methods ----------------------------------------------------------------------------------------------------------------------------------------------------------------
-    def get_all_users(self):
-        query = "SELECT * FROM user"
+    def get_all_users(self, limit=None, offset=None, stream=False, model=None):
+        # Streaming fetches every user in batches instead of all at once
+        if stream:
+            return self._stream_rows("SELECT * FROM user WHERE 1=1", [], model, user_converters)
+
+        query = "SELECT * FROM user ORDER BY id"
+        params = []
+
+        # Only fetch the requested slice of rows
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset or 0])
 
         with self.db_connection as db:
-            rows = db.execute_query(query)
+            rows = db.execute_query(query, params)
+        # Turn data from rows into dicts (or model records)
+        return self._map_rows(rows, model, user_converters)
 
-        users = []
-        # Turn data from rows into a list of dicts
-        for row in rows:
-            user = {column: row[column] for column in row.keys()}
-            if user["image"]:
-                user["image"] = f"{settings.MEDIA_URL}{user['image']}"
-            users.append(user)
-        return users
+    def count_users(self):
+        query = "SELECT COUNT(*) AS total FROM user"
+
+        with self.db_connection as db:
+            rows = db.execute_query(query)
+        return rows[0]["total"]
 
     def create_user(self, data):
         query = """
@@ -496,38 +1228,35 @@ class SQLiteDBQuery(DBQuery):
         query = "SELECT * FROM User WHERE id = ? LIMIT 1"
         params = (user_id,)
         with self.db_connection as db:
-            row = db.execute_query(query, params)
-        # The query returns a list of user rows, so return actual user instance
-        if row:
-            user = dict(row[0])
-            if user["image"]:
-                user["image"] = f"{settings.MEDIA_URL}{user['image']}"
-            return dict(user)
-        else:
-            return None
+            rows = db.execute_query(query, params)
+        # The query returns a list of user rows, so return the user's dict (None if there is no such user)
+        return self._map_first_row(rows, converters=user_converters)
 
     def get_user_by_username(self, username):
         query = "SELECT * FROM User WHERE username = ? LIMIT 1"
         params = (username,)
 
         with self.db_connection as db:
-            row = db.execute_query(query, params)
+            rows = db.execute_query(query, params)
 
-        # The query returns a list of user rows, so return actual user instance
-        if row:
-            user = dict(row[0])
-            if user["image"]:
-                user["image"] = f"{settings.MEDIA_URL}{user['image']}"
-            return user
-        else:
-            return None
+        # The query returns a list of user rows, so return the user's dict (None if there is no such user)
+        return self._map_first_row(rows, converters=user_converters)
+
+    def get_user_version(self, user_id):
+        query = "SELECT version FROM User WHERE id = ?"
+        params = (user_id,)
+        with self.db_connection as db:
+            row = db.execute_query(query, params)
+        # None if the user doesn't exist
+        return row[0]["version"] if row else None
 
     def partial_update_user(self, user_id, new_data):
-        # Exclude "id" key:value pair. We should not modify user's id
-        new_data = {key: value for key, value in new_data.items() if key != "id"}
+        # Exclude "id" and "version" key:value pairs. We should not modify user's id
+        new_data = {key: value for key, value in new_data.items() if key not in ["id", "version"]}
 
         # Dynamically generate a string for each column
-        columns = ", ".join(f"{key} = ?" for key in new_data.keys())
+        # (the version is bumped so tokens issued before the update are rejected in claims-only auth)
+        columns = ", ".join([f"{key} = ?" for key in new_data.keys()] + ["version = version + 1"])
 
         # Use the generated string to update all specified columns
         query = f"UPDATE user SET {columns} WHERE id = ?"
@@ -630,14 +1359,8 @@ class SQLiteDBQuery(DBQuery):
         with self.db_connection as db:
             rows = db.execute_query(query, params)
 
-        blocked_users = []
         # Turn data from rows into a list of dicts
-        for row in rows:
-            user = {column: row[column] for column in row.keys()}
-            if user["image"]:
-                user["image"] = f"{settings.MEDIA_URL}{user['image']}"
-            blocked_users.append(user)
-        return blocked_users
+        return self._map_rows(rows, converters=user_converters)
 
     # Message functions ----------------------------------------------------------------------------------------------------------------------------------------------------------------
     def create_message(self, sender_id, receiver_id, content):
@@ -656,6 +1379,22 @@ class SQLiteDBQuery(DBQuery):
             message_id = db.execute_query(query, params)
             return message_id
     
+    def bulk_create_messages(self, messages):
+        """Creates many messages in one batched insert.
+
+        Args:
+            messages (iterable): (sender_id, receiver_id, content) tuples.
+
+        Returns:
+            int: The number of messages created.
+        """
+        query = """
+        INSERT INTO Message (sender_id, receiver_id, content) 
+        VALUES (?, ?, ?)
+        """
+        with self.db_connection.transaction() as db:
+            return db.execute_many(query, messages)
+
     def delete_message(self, message_id, receiver_id):
         #query and param initialization
         query = "DELETE FROM Message WHERE receiver_id = ? AND id = ?"
@@ -670,24 +1409,24 @@ class SQLiteDBQuery(DBQuery):
         query = "SELECT * FROM Message WHERE receiver_id = ? and id = ? LIMIT 1"
         params = (receiver_id, message_id)
         #execute query
-        self.db_connection.connect()
-        message = self.db_connection.execute_query(query, params)
-        self.db_connection.disconnect()
-        
-        # The query returns a list of message rows, so return actual message instance
-        if message:
-            message = message[0]
-        return message
+        with self.db_connection as db:
+            rows = db.execute_query(query, params)
+
+        # The query returns a list of message rows, so return the message's dict (None if there is no such message)
+        return self._map_first_row(rows)
     
-    def get_all_messages(self, user_id):
+    def get_all_messages(self, user_id, stream=False, model=None):
         #make query and parameters
         query = "SELECT * FROM message WHERE receiver_id = ?"
         params = (user_id,)
 
+        #stream -> fetch the messages in batches instead of all at once (seeking through the receiver_id index)
+        if stream:
+            return self._stream_rows(query, params, model)
+
         #do query
         with self.db_connection as db:
             rows = db.execute_query(query, params)
 
-        # Turn data from rows into a list of dicts
-        users = [{column: row[column] for column in row.keys()} for row in rows]
-        return users
+        # Turn data from rows into a list of dicts (or model records)
+        return self._map_rows(rows, model)
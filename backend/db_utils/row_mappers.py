@@ -0,0 +1,94 @@
+'''
+CLASSES:
+RowMapper
+'''
+import threading
+from operator import itemgetter
+
+
+class RowMapper:
+    """Turns query rows into dicts or model records with a plan compiled once per query shape.
+
+    A query shape is the result's column names plus the target type and column converters.
+    The plan picks the needed columns with a single itemgetter and applies the converters
+    (ex. decoding JSON) by position, so no per row key lookups or intermediate dicts are made.
+    Mappers are cached, use get() instead of creating them directly.
+
+    Model types list their constructor arguments in a 'fields' tuple (ex. api.models.Listing).
+    Records are built positionally when the result's columns cover a prefix of the fields,
+    with keyword arguments otherwise. Columns that aren't fields are skipped.
+
+    Attributes:
+        columns (tuple): The result's column names.
+        model (type): The record type, or None to build dicts keyed by column name.
+        converters (dict): Column name -> function applied to that column's value.
+    """
+
+    _mappers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, columns, model=None, converters=None):
+        self.columns = tuple(columns)
+        self.model = model
+        self.converters = dict(converters or {})
+        self.map_row = self._compile()
+
+    @classmethod
+    def get(cls, columns, model=None, converters=None):
+        """Gets the cached mapper for a query shape, compiling it on first use.
+
+        Converters should be module or class level functions, so the same shape maps to the same key.
+
+        Args:
+            columns (iterable): The result's column names (ex. sqlite3.Row.keys()).
+            model (type, optional): The record type. Defaults to dicts.
+            converters (dict, optional): Column name -> function applied to that column's value.
+
+        Returns:
+            RowMapper: The mapper.
+        """
+        columns = tuple(columns)
+        key = (columns, model, tuple(sorted((converters or {}).items(), key=lambda item: item[0])))
+        mapper = cls._mappers.get(key)
+        if mapper is None:
+            with cls._lock:
+                mapper = cls._mappers.get(key)
+                if mapper is None:
+                    mapper = cls._mappers[key] = cls(columns, model, converters)
+        return mapper
+
+    def _compile(self):
+        model = self.model
+        if model is None:
+            names = self.columns
+        else:
+            names = tuple(field for field in model.fields if field in self.columns)
+        indices = [self.columns.index(name) for name in names]
+        if len(indices) == 1:
+            index = indices[0]
+            getter = lambda row: (row[index],)
+        else:
+            getter = itemgetter(*indices)
+        conversions = [(position, self.converters[name]) for position, name in enumerate(names) if name in self.converters]
+
+        if model is None:
+            build = lambda values: dict(zip(names, values))
+        elif names == model.fields[: len(names)]:
+            build = lambda values: model(*values)
+        else:
+            build = lambda values: model(**dict(zip(names, values)))
+
+        if not conversions:
+            return lambda row: build(getter(row))
+
+        def map_row(row):
+            values = list(getter(row))
+            for position, convert in conversions:
+                values[position] = convert(values[position])
+            return build(values)
+
+        return map_row
+
+    def map_rows(self, rows):
+        map_row = self.map_row
+        return [map_row(row) for row in rows]
@@ -0,0 +1,53 @@
+'''
+CLASSES: 
+LazyQuerySequence
+'''
+
+
+class LazyQuerySequence:
+    """Read-only sequence over a query's results that only fetches the rows that are asked for.
+
+    len() runs a COUNT query (once) and slicing runs a LIMIT/OFFSET query, so paginators like
+    DRF's PageNumberPagination only load the current page instead of the whole table.
+
+    Attributes:
+        count_func (callable): Takes no arguments and returns the total number of rows.
+        fetch_func (callable): Takes (limit, offset) and returns a list with that slice of rows.
+            A limit of None means fetch every row starting at offset.
+    """
+
+    def __init__(self, count_func, fetch_func):
+        self.count_func = count_func
+        self.fetch_func = fetch_func
+        self._count = None
+
+    def count(self):
+        # Django's Paginator calls count() when it exists instead of len()
+        if self._count is None:
+            self._count = self.count_func()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self.fetch_func(None, 0)[index]
+            if stop <= start:
+                return []
+            return self.fetch_func(stop - start, start)
+
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("LazyQuerySequence index out of range")
+        rows = self.fetch_func(1, index)
+        if not rows:
+            raise IndexError("LazyQuerySequence index out of range")
+        return rows[0]
+
+    def __iter__(self):
+        # Iterating (ex. serializing without pagination) loads every row
+        return iter(self.fetch_func(None, 0))
@@ -0,0 +1,88 @@
+'''
+CLASSES: 
+ListingCounterBuffer
+'''
+import atexit
+import threading
+
+
+class ListingCounterBuffer:
+    """Write-behind buffer that coalesces like/dislike increments in memory.
+
+    Increments are summed per listing and written to the Listing table by a background thread
+    every flush_interval_ms, in one transaction, so a burst of likes holds the write lock once
+    instead of once per like. Counts read from the database lag by at most one interval.
+
+    A failed flush keeps the increments for the next one. After max_failures failed flushes in a
+    row the pending increments are dropped (and logged), so a broken database can't grow them forever.
+
+    Attributes:
+        db_query (DBQuery): Query object used to write the increments.
+        flush_interval_ms (int): How often pending increments are written, in milliseconds.
+        max_failures (int): Number of failed flushes in a row after which the pending increments are dropped.
+    """
+
+    def __init__(self, db_query, flush_interval_ms=500, max_failures=5):
+        self.db_query = db_query
+        self.flush_interval_ms = flush_interval_ms
+        self.max_failures = max_failures
+        self._failures = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ListingCounterBuffer", daemon=True)
+            self._thread.start()
+            # Don't drop increments that are still buffered when the process exits
+            atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def add(self, listing_id, likes=0, dislikes=0):
+        listing_id = int(listing_id)
+        with self._lock:
+            pending_likes, pending_dislikes = self._pending.get(listing_id, (0, 0))
+            self._pending[listing_id] = (pending_likes + likes, pending_dislikes + dislikes)
+
+    def flush(self):
+        """Writes every pending increment in one batch.
+
+        Returns:
+            int: The number of listings that were updated.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            self.db_query.increment_listing_counters(pending)
+        except Exception:
+            self._failures += 1
+            if self._failures >= self.max_failures:
+                print(f"Dropping listing counter increments for {len(pending)} listings after {self._failures} failed flushes")
+                self._failures = 0
+            else:
+                # Put the increments back so they are retried on the next flush
+                for listing_id, (likes, dislikes) in pending.items():
+                    self.add(listing_id, likes, dislikes)
+            raise
+        self._failures = 0
+        return len(pending)
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval_ms / 1000):
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep flushing on the next interval, the increments were kept (or dropped) by flush()
+                print(f"Error flushing listing counters: {e}")
@@ -17,7 +17,7 @@ db_query = SQLiteDBQuery(DBFactory.get_db_connection(DBType.SQLITE))
 # Mediator Abstract Class
 class Mediator(ABC):
     @abstractmethod
-    def retrieve_all_messages(self, request):
+    def retrieve_all_messages(self, request, stream=False):
         pass
 
     @abstractmethod
@@ -36,10 +36,11 @@ class Mediator(ABC):
 # message mediator class
 class MessageMediator(Mediator):
     #retrieve all messages from a given user(request given, get user from that)
-    def retrieve_all_messages(self, request):
+    #stream -> returns a stream of message rows that are fetched in batches
+    def retrieve_all_messages(self, request, stream=False):
         #no reason to check user, will use the requesting users id anyways
-        messages = db_query.get_all_messages(int(request.user.id))
-        return [Message(**message) for message in messages]
+        #rows are mapped straight into Message records unless streaming
+        return db_query.get_all_messages(int(request.user.id), stream=stream, model=None if stream else Message)
     
     #retrieve a message from a given user(request given, get user from that)
     def retrieve_message(self, request, message_id):
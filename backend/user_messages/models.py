@@ -7,6 +7,10 @@ class Message:
     # We cant use django model stuff due to our custom db implementation
     # message_text = models.TextField()
 
+    # Constructor arguments, in order (used by db_utils.row_mappers.RowMapper)
+    fields = ("id", "sender_id", "receiver_id", "content")
+    __slots__ = fields
+
     # Constructor
     def __init__(self, id, sender_id, receiver_id, content):
         self.id = id
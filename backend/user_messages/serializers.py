@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from api.serializers import ReadOnlyListSerializer
 
 
 class MessageSerializer(serializers.Serializer):
@@ -6,3 +7,9 @@ class MessageSerializer(serializers.Serializer):
     sender_id = serializers.IntegerField(read_only=True)
     receiver_id = serializers.IntegerField(allow_null=False)
     content = serializers.CharField(max_length=200, allow_null=False)
+
+
+class MessageListSerializer(ReadOnlyListSerializer):
+    """Read-only version of MessageSerializer for message lists."""
+
+    fields = ("id", "sender_id", "receiver_id", "content")
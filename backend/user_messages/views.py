@@ -4,8 +4,9 @@ from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from api.streaming import StreamingJSONResponse
 from .message_mediators import MessageMediator
-from .serializers import MessageSerializer
+from .serializers import MessageListSerializer, MessageSerializer
 
 
 class MessageViewSet(viewsets.GenericViewSet):
@@ -54,9 +55,9 @@ class MessageViewSet(viewsets.GenericViewSet):
         """
 
         # Gets all messages and return it -> could be modified later to be filtered
-        messages = self.message_mediator.retrieve_all_messages(request)
-        serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Messages are streamed as they are fetched, so big inboxes aren't built in memory
+        messages = self.message_mediator.retrieve_all_messages(request, stream=True)
+        return StreamingJSONResponse(messages, serialize=MessageListSerializer.to_representation_many)
 
     def destroy(self, request, pk=None):
         """Deletes the specified Message.